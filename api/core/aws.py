@@ -1,13 +1,17 @@
 import base64
-import hashlib
+import functools
 import hmac
 
 
+@functools.lru_cache(maxsize=16)
+def _keyed_hmac(key: str) -> hmac.HMAC:
+    """HMAC with the inner/outer key pads already absorbed, to be copied per message."""
+    return hmac.new(bytes(key, "utf-8"), digestmod="sha256")
+
+
+@functools.lru_cache(maxsize=4096)
 def calculate_secret_hash(email: str, client_id: str, key: str) -> str:
-    return base64.b64encode(
-        hmac.new(
-            bytes(key, "utf-8"),
-            bytes(email + client_id, "utf-8"),
-            digestmod=hashlib.sha256,
-        ).digest()
-    ).decode()
+    """Cognito SECRET_HASH; memoized, call `cache_clear()` after rotating the secret."""
+    mac = _keyed_hmac(key).copy()
+    mac.update(bytes(email + client_id, "utf-8"))
+    return base64.b64encode(mac.digest()).decode()
@@ -0,0 +1,50 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    """Fail fast while a remote service keeps failing.
+
+    After `fail_max` consecutive failures the circuit opens and `allow` refuses calls.
+    Once `reset_timeout` seconds have passed, a single probe call is let through:
+    its success closes the circuit again, its failure re-opens it. A probe whose
+    outcome is not recorded within `reset_timeout` seconds no longer blocks the next.
+    """
+
+    def __init__(self, fail_max: int = 5, reset_timeout: float = 30.0):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probe_started: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            started = self._opened_at
+            if self._probe_started is not None:
+                started = self._probe_started
+            if now - started < self.reset_timeout:
+                return False
+            self._probe_started = now
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_started = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probe_started is not None or self._failures >= self.fail_max:
+                self._opened_at = time.monotonic()
+            self._probe_started = None
@@ -1,29 +1,217 @@
 import abc
+import collections
+import functools
 import io
 import os
-import re
 import shutil
+import stat
+import threading
 import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path, PurePosixPath
-from typing import Any, BinaryIO, Generator, cast
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    BinaryIO,
+    Callable,
+    Generator,
+    Iterable,
+    Literal,
+    TypeVar,
+    cast,
+)
 
-import boto3
-import humanize
-from botocore.client import Config
-from botocore.response import StreamingBody
-from botocore.utils import fix_s3_host
 from fastapi import Request
 from fastapi.responses import FileResponse, StreamingResponse
-from mypy_boto3_s3 import S3Client
-from mypy_boto3_s3.type_defs import ObjectIdentifierTypeDef
 
 from api import models, settings
-from api.schemas.file import FileHTTPRequest, FileInfo, FileTypes
+from api.core.ttl_cache import TTLCache
+from api.schemas.file import (
+    CompletedPart,
+    FileHTTPRequest,
+    FileInfo,
+    FileTypes,
+    MultipartUpload,
+)
+
+if TYPE_CHECKING:
+    # boto3 is imported lazily below, it is slow to load and unused with local storage
+    from boto3.s3.transfer import TransferConfig
+    from mypy_boto3_s3 import S3Client
+    from mypy_boto3_s3.paginator import ListObjectsV2Paginator
+    from mypy_boto3_s3.type_defs import GetObjectOutputTypeDef, ObjectIdentifierTypeDef
+
+try:
+    # Optional: ISA-L's SIMD deflate/crc32 as a drop-in zlib for the download zips
+    from isal import isal_zlib  # type: ignore[import-not-found,unused-ignore]
+
+    zipfile.zlib = isal_zlib  # type: ignore[attr-defined]
+except ImportError:
+    pass
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+_PathKind = Literal["file", "dir", "missing"]
+
+_ZIP_CHUNK_SIZE = 1 << 20
+
+# Connections of the shared S3 client (botocore's default is 10). All requests share
+# them, so the worker threads of one operation use at most S3_OPERATION_CONCURRENCY
+S3_MAX_POOL_CONNECTIONS = 50
+S3_OPERATION_CONCURRENCY = 10
+
+# Payloads that deflate barely shrinks (already compressed or dense binary data) are stored as-is
+_ZIP_STORED_SUFFIXES = frozenset(
+    {
+        *(".tif", ".tiff", ".h5", ".hdf5", ".npy", ".npz", ".pt", ".pth"),
+        *(".zip", ".gz", ".bz2", ".xz", ".zst", ".7z", ".png", ".jpg", ".jpeg"),
+    }
+)
+
+
+def _zip_compress_type(arcname: str) -> int:
+    suffix = os.path.splitext(arcname)[1].lower()
+    return (
+        zipfile.ZIP_STORED if suffix in _ZIP_STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+    )
+
+
+class _ZipSink:
+    """Write-only, non-seekable target for zipfile.ZipFile, drained while the archive is built."""
+
+    def __init__(self) -> None:
+        self._chunks: collections.deque[bytes] = collections.deque()
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self.size = 0
+        return data
+
+
+def _stream_zip(
+    members: Iterable[tuple[zipfile.ZipInfo, BinaryIO]],
+) -> Generator[bytes, Any, None]:
+    """Zip (entry, readable file) pairs, yielding the archive bytes as they are produced."""
+    sink = _ZipSink()
+    try:
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as zipf:
+            for zinfo, src in members:
+                zinfo.compress_type = _zip_compress_type(zinfo.filename)
+                try:
+                    with zipf.open(zinfo, mode="w", force_zip64=True) as dst:
+                        while chunk := src.read(_ZIP_CHUNK_SIZE):
+                            dst.write(chunk)
+                            if sink.size >= _ZIP_CHUNK_SIZE:
+                                yield sink.drain()
+                finally:
+                    src.close()
+                if sink.size >= _ZIP_CHUNK_SIZE:
+                    yield sink.drain()
+        yield sink.drain()
+    finally:
+        # On a client disconnect, let the member source release what it holds
+        if isinstance(members, Generator):
+            members.close()
+
+
+def _replace_suffix(url: str, old: str, new: str) -> str:
+    """Swap the endpoint at the end of `url` (plain string ops, no regex)."""
+    return url[: -len(old)] + new if old and url.endswith(old) else url
+
+
+@functools.cache
+def _upload_config() -> "TransferConfig":
+    """Large parts for multi-GB datasets, uploaded with a share of the client's connections."""
+    from boto3.s3.transfer import TransferConfig
+
+    return TransferConfig(
+        multipart_threshold=32 * 1024 * 1024,
+        multipart_chunksize=32 * 1024 * 1024,
+        max_concurrency=S3_OPERATION_CONCURRENCY,
+        io_chunksize=1024 * 1024,
+    )
+
+
+def _map_prefetched(
+    func: Callable[[_T], _R],
+    items: Iterable[_T],
+    window: int,
+    discard: Callable[[_R], None] | None = None,
+) -> Generator[_R, Any, None]:
+    """
+    Like map(), but keeps up to `window` calls running ahead in worker threads.
+    If the generator is closed early, results that were never yielded are passed
+    to `discard` (e.g. to release their connections) once their call completes.
+    """
+    executor = ThreadPoolExecutor(max_workers=window)
+    pending: collections.deque[Future[_R]] = collections.deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        if discard is not None:
+            for future in pending:
+                future.add_done_callback(functools.partial(_discard_result, discard))
+
+
+def _discard_result(discard: Callable[[_R], None], future: "Future[_R]") -> None:
+    if not future.cancelled() and future.exception() is None:
+        discard(future.result())
+
+
+_M = TypeVar("_M", bound=Callable[..., Any])
+
+# S3 errors caused by the client's multipart request, as opposed to storage failures
+_MULTIPART_REQUEST_ERRORS = ("NoSuchUpload", "InvalidPart", "InvalidPartOrder")
+
+
+def _invalidates_caches(method: _M) -> _M:
+    """Clear the instance's cached lookups once the decorated change is done (or failed).
+
+    Clearing afterwards, not before, so that lookups made while the change is
+    in progress cannot put outdated results back into the cache.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self: "FileSystem", *args: Any, **kwargs: Any) -> Any:
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._invalidate_caches()
+
+    return cast(_M, wrapper)
 
 
 class FileSystem(abc.ABC):
+    # Seconds a _probe() result is reused; mutations through this instance clear them
+    PROBE_TTL = 0.5
+    PROBE_CACHE_SIZE = 256
+
     def __init__(self, root_path: str, predef_dirs: list[str] | None = None):
         self.root_path = root_path
+        self._probe_cache: TTLCache[str, _PathKind] = TTLCache(
+            self.PROBE_CACHE_SIZE, self.PROBE_TTL
+        )
+        self._root = str(PurePosixPath(root_path))
+        self._root_prefix = self._root.rstrip("/") + "/"
         self._predef_dirs = predef_dirs or []
         self.init()
 
@@ -37,11 +225,16 @@ class FileSystem(abc.ABC):
     def list_directory(
         self, path: str = "", dirs: bool = True, recursive: bool = False
     ) -> Generator[FileInfo, Any, None]:
+        """Listing produced lazily as the backend returns it (unsorted)."""
         normalized_path = path if path.endswith("/") else path + "/"
+        # Checked eagerly, so callers get the error before consuming the listing
         if not self.isdir(normalized_path):
             raise NotADirectoryError(path)
         return self._directory_contents(normalized_path, dirs=dirs, recursive=recursive)
 
+    def _invalidate_caches(self) -> None:
+        self._probe_cache.clear()
+
     def _directory_contents(
         self, path: str, dirs: bool = True, recursive: bool = False
     ) -> Generator[FileInfo, Any, None]:
@@ -50,7 +243,8 @@ class FileSystem(abc.ABC):
     def get_file_info(self, path: str) -> FileInfo:
         raise NotImplementedError()
 
-    def create_file(self, path: str, file: BinaryIO) -> None:
+    def create_file(self, path: str, file: BinaryIO) -> FileInfo:
+        """Write the file and return its info, known from the write itself."""
         raise NotImplementedError()
 
     def create_file_url(
@@ -58,6 +252,20 @@ class FileSystem(abc.ABC):
     ) -> FileHTTPRequest:
         raise NotImplementedError()
 
+    def create_multipart_upload(self, path: str, parts: int) -> MultipartUpload:
+        """Start an upload whose parts the client sends in parallel, straight to storage."""
+        raise NotImplementedError()
+
+    def complete_multipart_upload(
+        self, path: str, upload_id: str, parts: list[CompletedPart]
+    ) -> FileInfo:
+        raise NotImplementedError()
+
+    def abort_multipart_upload(self, path: str, upload_id: str) -> None:
+        """Discard the parts uploaded so far, which storage keeps (and bills) otherwise."""
+        raise NotImplementedError()
+
+    @_invalidates_caches
     def rename(self, path: str, new_name: str) -> None:
         if not self.exists(path):
             raise FileNotFoundError(path)
@@ -71,10 +279,12 @@ class FileSystem(abc.ABC):
     def _rename_file(self, path: str, new_name: str) -> None:
         raise NotImplementedError()
 
+    @_invalidates_caches
     def delete(self, path: str, reinit_if_root: bool = True) -> None:
-        if not self.exists(path):
+        kind = self._probe(path)
+        if kind == "missing":
             return
-        if self.isdir(path):
+        if kind == "dir":
             self._delete_directory(path)
             if (path == "/" or path == "") and reinit_if_root:
                 self.init()
@@ -83,6 +293,11 @@ class FileSystem(abc.ABC):
         else:
             self._delete_file(path)
 
+    def delete_many(self, paths: list[str]) -> None:
+        """Delete several files or directories; backends may batch the requests."""
+        for path in paths:
+            self.delete(path)
+
     def _delete_file(self, path: str) -> None:
         raise NotImplementedError()
 
@@ -95,19 +310,41 @@ class FileSystem(abc.ABC):
     def isdir(self, path: str) -> bool:
         raise NotImplementedError()
 
+    def _probe(self, path: str) -> _PathKind:
+        """exists() and isdir() at once, memoized for PROBE_TTL seconds."""
+        kind = self._probe_cache.get(path)
+        if kind is None:
+            kind = self._lookup(path)
+            self._probe_cache.put(path, kind)
+        return kind
+
+    def _lookup(self, path: str) -> _PathKind:
+        # Backends override this to answer with a single call
+        if not self.exists(path):
+            return "missing"
+        return "dir" if self.isdir(path) else "file"
+
     def full_path_uri(self, path: str) -> str:
         raise NotImplementedError()
 
     def full_path(self, path: str) -> str:
-        # For some reason, PurePosixPath returns the root path if one of the components has root path
-        full = str(
-            PurePosixPath(self.root_path, path[1:] if path.startswith("/") else path)
-        )
-        return full if not path.endswith("/") else full + "/"
+        # Plain concatenation on the normalized root: this runs several times per request
+        rel = path[1:] if path.startswith("/") else path
+        if "//" in rel or "/./" in f"/{rel}/":
+            # Drop empty and "." segments (as PurePosixPath does), e.g. for "data//x"
+            parts = [part for part in rel.split("/") if part not in ("", ".")]
+            rel = "/".join(parts) + ("/" if parts and rel.endswith("/") else "")
+        if not rel:
+            return self._root + "/" if path.endswith("/") else self._root
+        return self._root_prefix + rel
 
     def download(self, path: str) -> FileResponse | StreamingResponse:
         raise NotImplementedError()
 
+    def download_redirect_url(self, path: str) -> str | None:
+        """URL to download the file from directly, bypassing the API, if any."""
+        return None
+
     def download_url(
         self, path: str, request: Request, url_endpoint: str, download_endpoint: str
     ) -> FileHTTPRequest:
@@ -117,27 +354,39 @@ class FileSystem(abc.ABC):
 class LocalFilesystem(FileSystem):
     """A filesystem that uses the local filesystem."""
 
+    @_invalidates_caches
     def create_directory(self, path: str) -> None:
         os.makedirs(self.full_path(path), exist_ok=True)
 
     def _directory_contents(
         self, path: str, dirs: bool = True, recursive: bool = False
     ) -> Generator[FileInfo, Any, None]:
-        if not recursive:
-            files = os.listdir(self.full_path(path))
-        else:
-            files = [
-                os.path.relpath(str(f), self.full_path(path))
-                for f in Path(self.full_path(path)).rglob("*")
-            ]
-        if not dirs:
-            files = [
-                f
-                for f in files
-                if not os.path.isdir(os.path.join(self.full_path(path), f))
-            ]
-        for file in files:
-            yield self.get_file_info((path if path != "/" else "") + file)
+        prefix = path if path != "/" else ""
+        for rel_path, entry in self._scan(self.full_path(path), recursive=recursive):
+            if entry.is_dir():
+                if dirs:
+                    yield FileInfo(
+                        path=prefix + rel_path + "/", type=FileTypes.directory
+                    )
+            else:
+                yield FileInfo(
+                    path=prefix + rel_path,
+                    type=FileTypes.file,
+                    size=entry.stat().st_size,
+                )
+
+    def _scan(
+        self, full_path: str, rel_path: str = "", recursive: bool = False
+    ) -> Generator[tuple[str, os.DirEntry[str]], Any, None]:
+        """Walk a directory with os.scandir, whose entries cache the file type."""
+        with os.scandir(full_path) as it:
+            entries = list(it)
+        for entry in entries:
+            yield rel_path + entry.name, entry
+            if recursive and entry.is_dir() and not entry.is_symlink():
+                yield from self._scan(
+                    entry.path, rel_path + entry.name + "/", recursive=True
+                )
 
     def get_file_info(self, path: str) -> FileInfo:
         metadata = os.stat(self.full_path(path))
@@ -145,29 +394,27 @@ class LocalFilesystem(FileSystem):
         return FileInfo(
             path=path + "/" if isdir else path,
             type=FileTypes.directory if isdir else FileTypes.file,
-            size=humanize.naturalsize(metadata.st_size) if not isdir else "",
+            size=metadata.st_size if not isdir else None,
         )
 
-    def create_file(self, path: str, file: BinaryIO) -> None:
+    @_invalidates_caches
+    def create_file(self, path: str, file: BinaryIO) -> FileInfo:
         dir_path = self.full_path(os.path.join(*os.path.split(path)[:-1]))
         os.makedirs(dir_path, exist_ok=True)
         with open(self.full_path(path), "wb") as f:
             shutil.copyfileobj(file, f)
+            size = f.tell()
+        return FileInfo(path=path, type=FileTypes.file, size=size)
 
     def create_file_url(
         self, path: str, request: Request, url_endpoint: str, upload_endpoint: str
     ) -> FileHTTPRequest:
         return FileHTTPRequest(
-            url=re.sub(url_endpoint, upload_endpoint, request.url._url),
+            url=_replace_suffix(request.url._url, url_endpoint, upload_endpoint),
             headers={"authorization": request.headers.get("authorization")},
             method="post",
         )
 
-    def delete(self, path: str, reinit_if_root: bool = True) -> None:
-        if not self.exists(path):
-            return
-        super().delete(path, reinit_if_root)
-
     def _rename_file(self, path: str, new_path: str) -> None:
         self.create_directory(os.path.dirname(new_path))
         os.rename(self.full_path(path), self.full_path(new_path))
@@ -186,31 +433,45 @@ class LocalFilesystem(FileSystem):
             return True
         return os.path.isdir(self.full_path(path))
 
+    def _lookup(self, path: str) -> _PathKind:
+        try:
+            st = os.stat(self.full_path(path))
+        except OSError:
+            return "missing"
+        return "dir" if path == "/" or stat.S_ISDIR(st.st_mode) else "file"
+
     def full_path_uri(self, path: str) -> str:
         return self.full_path(path)
 
     def download(self, path: str) -> FileResponse | StreamingResponse:
-        if not self.exists(path):
+        full_path = self.full_path(path)
+        try:
+            # Stat once and hand the result to FileResponse, which would stat again
+            st = os.stat(full_path)
+        except OSError:
             raise FileNotFoundError()
-        if self.isdir(path):
-            zip_io = io.BytesIO()
-            with zipfile.ZipFile(
-                zip_io, mode="w", compression=zipfile.ZIP_DEFLATED
-            ) as temp_zip:
+        if stat.S_ISDIR(st.st_mode):
+
+            def _open_files() -> Generator[tuple[zipfile.ZipInfo, BinaryIO], Any, None]:
                 for fpath in self.list_directory(path, dirs=False, recursive=True):
-                    temp_zip.write(
-                        self.full_path(str(fpath.path)),
-                        os.path.relpath(str(fpath.path), path),
-                    )
+                    full_path = self.full_path(str(fpath.path))
+                    arcname = os.path.relpath(str(fpath.path), path)
+                    # Keeps the file's mtime and permissions, as ZipFile.write does
+                    zinfo = zipfile.ZipInfo.from_file(full_path, arcname)
+                    with open(full_path, "rb") as f:
+                        yield zinfo, f
+
             return StreamingResponse(
-                iter([zip_io.getvalue()]),
-                media_type="application/x-zip-compressed",
+                _stream_zip(_open_files()),
+                media_type="application/zip",
                 headers={
                     "Content-Disposition": f"attachment; filename={path[:-1]}.zip"
                 },
             )
         else:
-            return FileResponse(self.full_path(path))
+            return FileResponse(
+                full_path, stat_result=st, filename=os.path.basename(path)
+            )
 
     def download_url(
         self, path: str, request: Request, url_endpoint: str, download_endpoint: str
@@ -218,7 +479,7 @@ class LocalFilesystem(FileSystem):
         if not self.exists(path):
             raise FileNotFoundError()
         return FileHTTPRequest(
-            url=re.sub(url_endpoint, download_endpoint, request.url._url),
+            url=_replace_suffix(request.url._url, url_endpoint, download_endpoint),
             headers={"authorization": request.headers.get("authorization")},
             method="get",
         )
@@ -227,17 +488,26 @@ class LocalFilesystem(FileSystem):
 class S3Filesystem(FileSystem):
     """A filesystem that uses S3."""
 
+    # Parallel object downloads when zipping a directory
+    DOWNLOAD_CONCURRENCY = S3_OPERATION_CONCURRENCY
+    DOWNLOAD_PREFETCH_MAX_SIZE = 8 * 1024 * 1024
+    # delete_objects accepts at most 1000 keys per request
+    DELETE_BATCH_SIZE = 1000
+    DELETE_CONCURRENCY = 4
+
     def __init__(
         self,
         root_path: str,
-        s3_client: S3Client,
+        s3_client: "S3Client",
         bucket: str,
         predef_dirs: list[str] | None = None,
     ):
         self.s3_client = s3_client
         self.bucket = bucket
+        self._uri_prefix = f"s3://{bucket}/"
         super().__init__(root_path=root_path, predef_dirs=predef_dirs)
 
+    @_invalidates_caches
     def create_directory(self, path: str) -> None:
         self.s3_client.put_object(Bucket=self.bucket, Key=self.full_path(path))
 
@@ -246,6 +516,9 @@ class S3Filesystem(FileSystem):
     ) -> Generator[FileInfo, Any, None]:
         full_path = self.full_path(path)
         paginator = self.s3_client.get_paginator("list_objects_v2")
+        if recursive:
+            yield from self._directory_contents_flat(paginator, full_path, dirs=dirs)
+            return
         page_iterator = paginator.paginate(
             Bucket=self.bucket, Prefix=full_path, Delimiter="/"
         )
@@ -257,30 +530,70 @@ class S3Filesystem(FileSystem):
                 yield FileInfo(
                     path=key["Key"][len(str(self.root_path)) + 1 :],
                     type=FileTypes.file,
-                    size=humanize.naturalsize(key["Size"]),
+                    size=key["Size"],
                 )
-            for key_prefix in page.get("CommonPrefixes", []):
-                dir_path = key_prefix["Prefix"][len(str(self.root_path)) + 1 :]
+            if dirs:
+                for key_prefix in page.get("CommonPrefixes", []):
+                    dir_path = key_prefix["Prefix"][len(str(self.root_path)) + 1 :]
+                    yield FileInfo(path=dir_path, type=FileTypes.directory)
+
+    def _directory_contents_flat(
+        self, paginator: "ListObjectsV2Paginator", full_path: str, dirs: bool = True
+    ) -> Generator[FileInfo, Any, None]:
+        """
+        List a whole subtree with a single (paginated) listing, without delimiter.
+        Directories are derived from the key paths instead of listed level by level.
+        """
+        root_len = len(str(self.root_path)) + 1
+        seen_dirs: set[str] = set()
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=full_path):
+            for key in page.get("Contents", []):
+                key_path = key["Key"]
+                if key_path == full_path:
+                    continue
                 if dirs:
-                    yield FileInfo(path=dir_path, type=FileTypes.directory, size="")
-                if recursive:
-                    for ret in self._directory_contents(
-                        dir_path, dirs=dirs, recursive=recursive
-                    ):
-                        yield ret
+                    sep = key_path.find("/", len(full_path))
+                    while sep != -1:
+                        dir_key = key_path[: sep + 1]
+                        if dir_key not in seen_dirs:
+                            seen_dirs.add(dir_key)
+                            yield FileInfo(
+                                path=dir_key[root_len:], type=FileTypes.directory
+                            )
+                        sep = key_path.find("/", sep + 1)
+                if not key_path.endswith("/"):
+                    yield FileInfo(
+                        path=key_path[root_len:],
+                        type=FileTypes.file,
+                        size=key["Size"],
+                    )
 
     def get_file_info(self, path: str) -> FileInfo:
-        metadata = self.s3_client.head_object(
-            Bucket=self.bucket, Key=self.full_path(path)
-        )
+        from botocore.exceptions import ClientError
+
+        try:
+            metadata = self.s3_client.head_object(
+                Bucket=self.bucket, Key=self.full_path(path)
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                raise FileNotFoundError(path) from e
+            raise
         return FileInfo(
             path=path,
             type=FileTypes.file,
-            size=humanize.naturalsize(metadata["ContentLength"]),
+            size=metadata["ContentLength"],
         )
 
-    def create_file(self, path: str, file: BinaryIO) -> None:
-        self.s3_client.upload_fileobj(file, self.bucket, self.full_path(path))
+    @_invalidates_caches
+    def create_file(self, path: str, file: BinaryIO) -> FileInfo:
+        start = file.tell()
+        size = file.seek(0, os.SEEK_END) - start
+        file.seek(start)
+        self.s3_client.upload_fileobj(
+            file, self.bucket, self.full_path(path), Config=_upload_config()
+        )
+        return FileInfo(path=path, type=FileTypes.file, size=size)
 
     def create_file_url(
         self, path: str, request: Request, url_endpoint: str, upload_endpoint: str
@@ -305,6 +618,67 @@ class S3Filesystem(FileSystem):
             method="post",
         )
 
+    def create_multipart_upload(self, path: str, parts: int) -> MultipartUpload:
+        key = self.full_path(path)
+        upload_id = self.s3_client.create_multipart_upload(Bucket=self.bucket, Key=key)[
+            "UploadId"
+        ]
+        return MultipartUpload(
+            upload_id=upload_id,
+            parts=[
+                FileHTTPRequest(
+                    url=self.s3_client.generate_presigned_url(
+                        "upload_part",
+                        Params={
+                            "Bucket": self.bucket,
+                            "Key": key,
+                            "UploadId": upload_id,
+                            "PartNumber": part_number,
+                        },
+                        ExpiresIn=60 * 60,
+                    ),
+                    method="put",
+                )
+                for part_number in range(1, parts + 1)
+            ],
+        )
+
+    @_invalidates_caches
+    def complete_multipart_upload(
+        self, path: str, upload_id: str, parts: list[CompletedPart]
+    ) -> FileInfo:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.full_path(path),
+                UploadId=upload_id,
+                MultipartUpload={
+                    "Parts": [
+                        {"PartNumber": part.part_number, "ETag": part.etag}
+                        for part in parts
+                    ]
+                },
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] in _MULTIPART_REQUEST_ERRORS:
+                raise ValueError(e.response["Error"]["Message"]) from e
+            raise
+        return self.get_file_info(path)
+
+    def abort_multipart_upload(self, path: str, upload_id: str) -> None:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.full_path(path), UploadId=upload_id
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] in _MULTIPART_REQUEST_ERRORS:
+                raise ValueError(e.response["Error"]["Message"]) from e
+            raise
+
     def _rename_file(self, path: str, new_path: str) -> None:
         self.s3_client.copy_object(
             Bucket=self.bucket,
@@ -317,21 +691,68 @@ class S3Filesystem(FileSystem):
         self.s3_client.delete_object(Bucket=self.bucket, Key=self.full_path(path))
 
     def _delete_directory(self, path: str) -> None:
-        paginator = self.s3_client.get_paginator("list_objects_v2")
-        page_iterator = paginator.paginate(
-            Bucket=self.bucket, Prefix=self.full_path(path)
+        self._delete_keys(self._list_keys(self.full_path(path)))
+
+    @_invalidates_caches
+    def delete_many(self, paths: list[str]) -> None:
+        if any(path.strip("/") in self._predef_dirs + [""] for path in paths):
+            # These must be re-created after deletion
+            return super().delete_many(paths)
+        self._delete_keys(
+            key
+            for path in paths
+            for key in (
+                self._list_keys(self.full_path(path))
+                if path.endswith("/")
+                else [self.full_path(path)]
+            )
         )
-        delete_objects: list[ObjectIdentifierTypeDef] = []
-        for page in page_iterator:
+
+    def _list_keys(self, prefix: str) -> Generator[str, Any, None]:
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
             for key in page.get("Contents", []):
-                delete_objects.append({"Key": key["Key"]})
-        self.s3_client.delete_objects(
-            Bucket=self.bucket, Delete={"Objects": delete_objects}
+                yield key["Key"]
+
+    def _delete_keys(self, keys: Iterable[str]) -> None:
+        # Send each batch off while the listing continues
+        with ThreadPoolExecutor(max_workers=self.DELETE_CONCURRENCY) as executor:
+            futures: list[Future[Any]] = []
+            batch: list[ObjectIdentifierTypeDef] = []
+            for key in keys:
+                batch.append({"Key": key})
+                if len(batch) == self.DELETE_BATCH_SIZE:
+                    futures.append(self._submit_delete(executor, batch))
+                    batch = []
+            if batch:
+                futures.append(self._submit_delete(executor, batch))
+            for future in futures:
+                future.result()
+
+    def _submit_delete(
+        self, executor: ThreadPoolExecutor, batch: "list[ObjectIdentifierTypeDef]"
+    ) -> Future[Any]:
+        return executor.submit(
+            self.s3_client.delete_objects,
+            Bucket=self.bucket,
+            Delete={"Objects": batch, "Quiet": True},
         )
 
     def exists(self, path: str) -> bool:
+        full_path = self.full_path(path)
+        if not full_path.endswith("/"):
+            # A HEAD is cheaper than a LIST; on a miss it may still be a directory
+            from botocore.exceptions import ClientError
+
+            try:
+                self.s3_client.head_object(Bucket=self.bucket, Key=full_path)
+                return True
+            except ClientError as e:
+                if e.response["Error"]["Code"] not in ("404", "NoSuchKey", "NotFound"):
+                    raise
+            full_path += "/"
         objects = self.s3_client.list_objects_v2(
-            Bucket=self.bucket, Prefix=self.full_path(path), MaxKeys=1
+            Bucket=self.bucket, Prefix=full_path, MaxKeys=1
         )
         return "Contents" in objects
 
@@ -340,69 +761,120 @@ class S3Filesystem(FileSystem):
             return True
         return self.exists(path) and path.endswith("/")
 
+    def _lookup(self, path: str) -> _PathKind:
+        # Directories are keys ending with "/", so one listing answers both questions
+        if not self.exists(path):
+            return "missing"
+        return "dir" if path == "/" or path.endswith("/") else "file"
+
     def full_path_uri(self, path: str) -> str:
-        return "s3://" + self.bucket + "/" + self.full_path(path)
+        return self._uri_prefix + self.full_path(path)
 
     def download(self, path: str) -> StreamingResponse:
-        if not self.exists(path):
+        kind = self._probe(path)
+        if kind == "missing":
             raise FileNotFoundError()
 
-        def _get_file_content(path: str) -> StreamingBody:
+        def _get_object(path: str) -> "GetObjectOutputTypeDef":
             return self.s3_client.get_object(
                 Bucket=self.bucket, Key=self.full_path(path)
-            )["Body"]
+            )
 
-        if self.isdir(path):
-            zip_buffer = io.BytesIO()
-            with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
-                for file in self.list_directory(path, dirs=False, recursive=True):
-                    fpath = str(file.path)
-                    zipf.writestr(
-                        os.path.relpath(fpath, path), _get_file_content(fpath).read()
-                    )
-            zip_buffer.seek(0)
+        if kind == "dir":
+
+            def _fetch(file: FileInfo) -> tuple[zipfile.ZipInfo, BinaryIO]:
+                fpath = str(file.path)
+                obj = _get_object(fpath)
+                content = cast(BinaryIO, obj["Body"])
+                # Small objects are read ahead in the worker; larger ones are streamed
+                # into the zip chunk by chunk, so memory stays bounded by the window
+                if obj["ContentLength"] <= self.DOWNLOAD_PREFETCH_MAX_SIZE:
+                    content = io.BytesIO(content.read())
+                # Zip timestamps are local time, as for local files
+                mtime = obj["LastModified"].astimezone().timetuple()[:6]
+                zinfo = zipfile.ZipInfo(os.path.relpath(fpath, path), date_time=mtime)
+                zinfo.external_attr = 0o644 << 16
+                return zinfo, content
+
+            files = self.list_directory(path, dirs=False, recursive=True)
+            members = _map_prefetched(
+                _fetch,
+                files,
+                self.DOWNLOAD_CONCURRENCY,
+                discard=lambda member: member[1].close(),
+            )
             headers = {
                 "Content-Disposition": f"attachment; filename={path[:-1]}.zip",
-                "Content-Type": "application/zip",
             }
-            return StreamingResponse(io.BytesIO(zip_buffer.read()), headers=headers)
+            return StreamingResponse(
+                _stream_zip(members), media_type="application/zip", headers=headers
+            )
         else:
-            return StreamingResponse(content=_get_file_content(path).iter_chunks())
+            return StreamingResponse(content=_get_object(path)["Body"].iter_chunks())
+
+    def download_redirect_url(self, path: str) -> str | None:
+        kind = self._probe(path)
+        if kind == "missing":
+            raise FileNotFoundError()
+        if kind == "dir":
+            return None  # zipped by the API
+        return self._presigned_get_url(path)
 
     def download_url(
         self, path: str, request: Request, url_endpoint: str, download_endpoint: str
     ) -> FileHTTPRequest:
-        bucket = self.bucket
-        path = self.full_path(path)
-        response = self.s3_client.list_objects_v2(Bucket=bucket, Prefix=path)
-        if "Contents" not in response:
+        if self._probe(path) == "missing":
             raise FileNotFoundError()
-        return FileHTTPRequest(
-            url=self.s3_client.generate_presigned_url(
-                "get_object",
-                Params={"Bucket": bucket, "Key": path},
-                ExpiresIn=60 * 10,
-            ),
-            method="get",
+        return FileHTTPRequest(url=self._presigned_get_url(path), method="get")
+
+    def _presigned_get_url(self, path: str) -> str:
+        return self.s3_client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self.full_path(path)},
+            ExpiresIn=60 * 10,
         )
 
 
+_s3_client: "S3Client | None" = None
+_s3_client_lock = threading.Lock()
+
+
+def _get_s3_client() -> "S3Client":
+    """Process-wide S3 client, so its endpoint setup and connection pool are reused."""
+    global _s3_client
+    with _s3_client_lock:
+        if _s3_client is None:
+            import boto3
+            from botocore.client import Config
+            from botocore.utils import fix_s3_host
+
+            s3_client = boto3.client(
+                "s3",
+                region_name=settings.s3_region,
+                endpoint_url=f"https://s3.{settings.s3_region}.amazonaws.com",
+                config=Config(
+                    signature_version="v4",
+                    s3={"addressing_style": "path"},
+                    max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                ),
+            )
+            # this and config=... required to avoid DNS problems with new buckets
+            s3_client.meta.events.unregister("before-sign.s3", fix_s3_host)
+            _s3_client = s3_client
+        return _s3_client
+
+
 def get_filesystem_with_root(root_path: str) -> FileSystem:
     """Get the filesystem to use."""
     predef_dirs = [e.value for e in models.UploadFileTypes] + [
         e.value for e in models.OutputEndpoints
     ]
     if settings.filesystem == "s3":
-        s3_client = boto3.client(
-            "s3",
-            region_name=settings.s3_region,
-            endpoint_url=f"https://s3.{settings.s3_region}.amazonaws.com",
-            config=Config(signature_version="v4", s3={"addressing_style": "path"}),
-        )
-        # this and config=... required to avoid DNS problems with new buckets
-        s3_client.meta.events.unregister("before-sign.s3", fix_s3_host)
         return S3Filesystem(
-            root_path, s3_client, cast(str, settings.s3_bucket), predef_dirs=predef_dirs
+            root_path,
+            _get_s3_client(),
+            cast(str, settings.s3_bucket),
+            predef_dirs=predef_dirs,
         )
     elif settings.filesystem == "local":
         return LocalFilesystem(root_path, predef_dirs=predef_dirs)
@@ -410,6 +882,10 @@ def get_filesystem_with_root(root_path: str) -> FileSystem:
         raise ValueError("Invalid filesystem setting")
 
 
+@functools.lru_cache(maxsize=1024)
 def get_user_filesystem(user_id: str) -> FileSystem:
-    """Get the filesystem to use for a user."""
+    """
+    Get the filesystem to use for a user.
+    Cached per user, so the predefined directories are only created on first use.
+    """
     return get_filesystem_with_root(str(Path(settings.user_data_root_path) / user_id))
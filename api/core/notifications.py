@@ -1,8 +1,10 @@
 import abc
+import email.utils
+import random
 import time
 
 import mailjet_rest  # type: ignore
-from fastapi import HTTPException
+from fastapi import BackgroundTasks, HTTPException
 from requests import Response
 
 
@@ -21,9 +23,25 @@ class DummyEmailSender(EmailSender):
         pass
 
 
+class BackgroundEmailSender(EmailSender):
+    """Defer sending to after the response, so slow or throttled sends do not block requests."""
+
+    def __init__(self, sender: EmailSender, background_tasks: BackgroundTasks):
+        self.sender = sender
+        self.background_tasks = background_tasks
+
+    def send_email(self, to: str, subject: str, body: str) -> None:
+        self.background_tasks.add_task(self.sender.send_email, to, subject, body)
+
+
 class MailjetEmailSender(EmailSender):
     """Email sender using Mailjet."""
 
+    max_retries = 5
+    # Full-jitter exponential backoff between retries, in seconds
+    backoff_base = 2.0
+    backoff_cap = 60.0
+
     def __init__(self, api_key: str, secret_key: str, sender_address: str):
         self.mailjet = mailjet_rest.Client(auth=(api_key, secret_key), version="v3.1")
         self.sender_address = sender_address
@@ -43,13 +61,32 @@ class MailjetEmailSender(EmailSender):
         retries = 0
         while True:
             result: Response = self.mailjet.send.create(data=data)
-            if str(result.status_code).startswith("2"):
+            if 200 <= result.status_code < 300:
                 break
-            elif result.status_code == 429 and retries < 5:
+            elif (
+                result.status_code == 429 or result.status_code >= 500
+            ) and retries < self.max_retries:
+                time.sleep(self._retry_delay(result, retries))
                 retries += 1
-                time.sleep(30)
             else:
                 raise HTTPException(
                     status_code=500,
                     detail=f"Failed to send email: {result.status_code} {result.text}",
                 )
+
+    def _retry_delay(self, result: Response, retries: int) -> float:
+        """Server-advised Retry-After (seconds or HTTP date) if any, else jittered backoff."""
+        retry_after = result.headers.get("Retry-After")
+        if retry_after:
+            delay: float | None = None
+            if retry_after.isdigit():
+                delay = float(retry_after)
+            else:
+                try:
+                    retry_date = email.utils.parsedate_to_datetime(retry_after)
+                    delay = retry_date.timestamp() - time.time()
+                except (TypeError, ValueError):
+                    pass
+            if delay is not None:
+                return min(self.backoff_cap, max(0.0, delay))
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2**retries))
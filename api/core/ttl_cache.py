@@ -0,0 +1,58 @@
+import collections
+import threading
+import time
+from typing import Callable, Generic, Hashable, TypeVar
+
+_K = TypeVar("_K", bound=Hashable)
+_V = TypeVar("_V")
+
+
+class TTLCache(Generic[_K, _V]):
+    """Thread-safe cache whose entries expire `ttl` seconds after being stored.
+
+    At most `maxsize` entries are kept: storing an entry first evicts the expired
+    ones, then the oldest ones beyond the limit.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # Insertion order is expiry order, since all entries share the same TTL
+        self._entries: collections.OrderedDict[_K, tuple[float, _V]] = (
+            collections.OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: _K) -> _V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def put(self, key: _K, value: _V) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (now + self.ttl, value)
+            while self._entries:
+                expires, _ = next(iter(self._entries.values()))
+                if expires > now and len(self._entries) <= self.maxsize:
+                    break
+                self._entries.popitem(last=False)
+
+    def remove_if(self, predicate: Callable[[_K], bool]) -> None:
+        """Remove the entries whose key matches `predicate`."""
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -1,14 +1,26 @@
+import datetime
+import functools
+import itertools
 import os
-from typing import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Generator
 
-from fastapi import HTTPException, status
+import requests
+from fastapi import BackgroundTasks, HTTPException, status
+from sqlalchemy import delete, func, literal, select, tuple_, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from api import models, settings
-from api.core.filesystem import FileSystem, get_user_filesystem
+from api.core.filesystem import (
+    S3_OPERATION_CONCURRENCY,
+    FileSystem,
+    get_user_filesystem,
+)
 from api.schemas import job as schemas
 
+_INPUT_CONCURRENCY = S3_OPERATION_CONCURRENCY
+
 
 def enqueue_job(
     job: models.Job, enqueueing_func: Callable[[schemas.QueueJob], None]
@@ -23,21 +35,18 @@ def enqueue_job(
     # Handler parameters
     handler_config = job_config["handler"]
 
-    def prepare_files(root_in: str, root_out: str, fs: FileSystem) -> dict[str, str]:
-        root_in_dir = root_in + ("/" if not root_in[-1] == "/" else "")
-        out_files = {}
-        if not fs.isdir(root_in_dir):
-            in_files = [root_in]
-        else:
-            in_files = [
-                f.path
-                for f in fs.list_directory(root_in_dir, dirs=False, recursive=True)
-            ]
-        for in_f in in_files:
-            out_files[f"{root_out}/{os.path.relpath(in_f, root_in)}"] = (
-                fs.full_path_uri(in_f)
-            )
-        return out_files
+    def prepare_files(
+        root_in: str, root_out: str, fs: FileSystem
+    ) -> Generator[tuple[str, str], Any, None]:
+        in_prefix = root_in.rstrip("/") + "/"
+        out_prefix = f"{root_out}/"
+        for in_f in in_files[root_in]:
+            # Listed files all sit below root_in: strip it instead of os.path.relpath
+            if in_f.startswith(in_prefix):
+                rel_path = in_f[len(in_prefix) :]
+            else:
+                rel_path = os.path.relpath(in_f, root_in)
+            yield out_prefix + rel_path, fs.full_path_uri(in_f)
 
     config_path = f"config/{job.attributes['files_down']['config_id']}"
     data_paths = [
@@ -47,15 +56,19 @@ def enqueue_job(
         f"artifact/{artifact_id}"
         for artifact_id in job.attributes["files_down"]["artifact_ids"]
     ]
-    _validate_files(user_fs, [config_path] + data_paths + artifact_paths)
+    # Validates and lists every input up front, before anything is enqueued
+    in_files = _list_inputs(user_fs, [config_path] + data_paths + artifact_paths)
     roots_down = handler_config["files_down"]
-    files_down = prepare_files(config_path, roots_down["config_id"], user_fs)
-    for data_path in data_paths:
-        files_down.update(prepare_files(data_path, roots_down["data_ids"], user_fs))
-    for artifact_path in artifact_paths:
-        files_down.update(
-            prepare_files(artifact_path, roots_down["artifact_ids"], user_fs)
+    files_down = dict(
+        itertools.chain(
+            prepare_files(config_path, roots_down["config_id"], user_fs),
+            *(prepare_files(p, roots_down["data_ids"], user_fs) for p in data_paths),
+            *(
+                prepare_files(p, roots_down["artifact_ids"], user_fs)
+                for p in artifact_paths
+            ),
         )
+    )
 
     app_specs = schemas.AppSpecs(
         cmd=job_config["app"]["cmd"],
@@ -76,9 +89,7 @@ def enqueue_job(
     )
 
     paths_upload = {
-        "output": user_fs.full_path_uri(job.paths_out["output"]),
-        "log": user_fs.full_path_uri(job.paths_out["log"]),
-        "artifact": user_fs.full_path_uri(job.paths_out["artifact"]),
+        key: user_fs.full_path_uri(path) for key, path in job.paths_out.items()
     }
 
     queue_item = schemas.QueueJob(
@@ -96,23 +107,97 @@ def enqueue_job(
 def get_jobs(
     db: Session, user_id: int, offset: int = 0, limit: int = 100
 ) -> list[models.Job]:
+    """Deprecated: OFFSET scans all skipped rows, prefer `get_jobs_after`."""
     return (
         db.query(models.Job)
         .filter(models.Job.user_id == user_id)
+        # id breaks ties, so pages are stable; `get_jobs_after` seeks in this same order
+        .order_by(models.Job.date_created.desc(), models.Job.id.desc())
         .offset(offset)
         .limit(limit)
         .all()
     )
 
 
-def get_job(db: Session, job_id: int) -> models.Job | None:
-    return db.query(models.Job).get(job_id)
+def get_jobs_after(
+    db: Session, user_id: str, last_id: int | None = None, limit: int = 100
+) -> list[models.Job]:
+    """Jobs of the user listed after job `last_id` (keyset pagination).
+
+    Same order as `get_jobs`, so it also continues its pages; empty if the user
+    has no job `last_id`.
+    """
+    query = select(models.Job).where(models.Job.user_id == user_id)
+    if last_id is not None:
+        last_created = (
+            select(models.Job.date_created)
+            .where(models.Job.id == last_id, models.Job.user_id == user_id)
+            .scalar_subquery()
+        )
+        query = query.where(
+            tuple_(models.Job.date_created, models.Job.id)
+            < tuple_(last_created, literal(last_id))
+        )
+    query = query.order_by(models.Job.date_created.desc(), models.Job.id.desc())
+    return list(db.scalars(query.limit(limit)))
+
+
+def get_user_job(db: Session, job_id: int, user_id: str) -> models.Job | None:
+    """The job, or None if it does not exist or belongs to another user."""
+    query = select(models.Job).where(
+        models.Job.id == job_id, models.Job.user_id == user_id
+    )
+    return db.scalars(query).one_or_none()
+
+
+def update_job_status(
+    db: Session, job_id: int, status: models.JobStates, runtime_details: str | None
+) -> models.Job | None:
+    """Apply a status update in a single UPDATE ... RETURNING statement."""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    values: dict[str, Any] = {"status": status.value}
+    # Set the start/finish dates on the first matching transition only
+    if status == models.JobStates.pulled:
+        values["date_started"] = func.coalesce(models.Job.date_started, now)
+    if status in (models.JobStates.finished, models.JobStates.error):
+        values["date_finished"] = func.coalesce(models.Job.date_finished, now)
+    if runtime_details:
+        values["runtime_details"] = (
+            func.coalesce(models.Job.runtime_details, "") + "\n" + runtime_details
+        )
+    stmt = (
+        update(models.Job)
+        .where(models.Job.id == job_id)
+        .values(**values)
+        .returning(models.Job)
+        .execution_options(populate_existing=True)
+    )
+    db_job = db.scalars(stmt).one_or_none()
+    db.commit()
+    return db_job
+
+
+def _list_inputs(filesystem: FileSystem, paths: list[str]) -> dict[str, list[str]]:
+    if len(paths) <= 1:
+        return {path: _list_input_files(filesystem, path) for path in paths}
+    # Each input costs storage round-trips (S3 requests), so resolve them concurrently
+    with ThreadPoolExecutor(
+        max_workers=min(len(paths), _INPUT_CONCURRENCY)
+    ) as executor:
+        files = executor.map(functools.partial(_list_input_files, filesystem), paths)
+        return dict(zip(paths, files))
 
 
-def _validate_files(filesystem: FileSystem, paths: list[str]) -> None:
-    for _file in paths:
-        if not filesystem.exists(_file):
+def _list_input_files(filesystem: FileSystem, path: str) -> list[str]:
+    """The file at `path`, or all files below it if it is a directory."""
+    try:
+        return [
+            f.path for f in filesystem.list_directory(path, dirs=False, recursive=True)
+        ]
+    except NotADirectoryError:
+        if not filesystem.exists(path):
             raise FileNotFoundError()
+        return [path]
 
 
 def create_job(
@@ -146,18 +231,65 @@ def create_job(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=ve,
         )
-    enqueue_job(db_job, enqueueing_func)
+    # Commit before the (slow) enqueue request, so the insert does not hold locks meanwhile
     db.commit()
-    db.refresh(db_job)
+    try:
+        enqueue_job(db_job, enqueueing_func)
+    except Exception as e:
+        if _may_have_been_enqueued(e):
+            # Keep the job: if it was queued, its status updates must find it
+            db_job.status = models.JobStates.error.value
+            db_job.runtime_details = f"Enqueueing failed, the job may still run: {e!r}"
+        else:
+            db.delete(db_job)
+        db.commit()
+        raise
     return db_job
 
 
-def delete_job(db: Session, db_job: models.Job) -> models.Job:
-    db.delete(db_job)
-    user_fs = get_user_filesystem(user_id=db_job.user_id)
-    for path in db_job.paths_out.values():
-        if path[-1] != "/":
-            path += "/"
-        user_fs.delete(path)
+def _may_have_been_enqueued(error: Exception) -> bool:
+    """Whether the worker-facing API may have accepted the job despite `error`.
+
+    The request was sent but its response was lost, e.g. on a read timeout.
+    Errors before sending and error responses mean that the job was not queued.
+    """
+    return isinstance(error, requests.RequestException) and not isinstance(
+        error, requests.ConnectTimeout
+    )
+
+
+def delete_user_job(
+    db: Session,
+    job_id: int,
+    user_id: str,
+    background_tasks: BackgroundTasks | None = None,
+) -> bool:
+    """Delete the user's job, then its outputs (as a background task, if tasks are given).
+
+    A single DELETE ... RETURNING; False if the user has no such job.
+    """
+    stmt = (
+        delete(models.Job)
+        .where(models.Job.id == job_id, models.Job.user_id == user_id)
+        .returning(models.Job.paths_out)
+    )
+    paths_out = db.scalars(stmt).one_or_none()
+    # Commit first: outputs of a job that is still listed must not disappear
     db.commit()
-    return db_job
+    if paths_out is None:
+        return False
+    _delete_outputs(user_id, paths_out, background_tasks)
+    return True
+
+
+def _delete_outputs(
+    user_id: str,
+    paths_out: dict[str, str],
+    background_tasks: BackgroundTasks | None,
+) -> None:
+    user_fs = get_user_filesystem(user_id=user_id)
+    paths = [path if path[-1] == "/" else path + "/" for path in paths_out.values()]
+    if background_tasks is None:
+        user_fs.delete_many(paths)
+    else:
+        background_tasks.add_task(user_fs.delete_many, paths)
@@ -4,15 +4,27 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session, sessionmaker
 
-from api.settings import database_url
+from api import settings
 
-engine = create_engine(
-    database_url,
-    connect_args=(
-        {"check_same_thread": False} if database_url.startswith("sqlite") else {}
-    ),
+if settings.database_url.startswith("sqlite"):
+    engine = create_engine(
+        settings.database_url, connect_args={"check_same_thread": False}
+    )
+else:
+    engine = create_engine(
+        settings.database_url,
+        # Per worker process, by default one connection per request thread (see
+        # settings); connections beyond pool_size are closed again once returned
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        pool_timeout=settings.database_pool_timeout,
+        pool_recycle=1800,  # below typical server/proxy idle timeouts
+        pool_pre_ping=True,  # transparently replace connections dropped by the server
+    )
+# Sessions are request-scoped: keep loaded attributes after commit instead of re-selecting
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
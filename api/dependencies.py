@@ -1,22 +1,73 @@
-from typing import Any, Callable
+import functools
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, TypeVar
 
 import requests
-from fastapi import Depends, Header, HTTPException, Request
-from fastapi.encoders import jsonable_encoder
-from fastapi.security import HTTPAuthorizationCredentials
+from fastapi import BackgroundTasks, Depends, Header, HTTPException, Request
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from fastapi_cloudauth import messages  # type: ignore
 from fastapi_cloudauth.cognito import CognitoClaims, CognitoCurrentUser  # type: ignore
-from pydantic import BaseModel, Field
+from jose import JWTError, jwt  # type: ignore
+from pydantic import Field, ValidationError
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from api import settings
 from api.core import notifications
+from api.core.circuit_breaker import CircuitBreaker
 from api.core.filesystem import FileSystem, get_user_filesystem
 from api.schemas.job import QueueJob
+from api.schemas.user import User
 
 
 class GroupClaims(CognitoClaims):  # type: ignore
     """CognitoClaims with added groups claim."""
 
     cognito_groups: list[str] | None = Field(alias="cognito:groups")
+    exp: int | None = None
+
+    @functools.cached_property
+    def user_json(self) -> bytes:
+        """Serialized `User`, built once per verified (and cached) token."""
+        user = User.model_validate({"email": self.email, "groups": self.cognito_groups})
+        return user.model_dump_json().encode()
+
+
+# Verified users and rejections by token hash: repeated requests skip verification
+_token_cache: OrderedDict[bytes, tuple[GroupClaims, float]] = OrderedDict()
+_rejected_token_cache: OrderedDict[bytes, tuple[HTTPException, float]] = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+_T = TypeVar("_T")
+
+
+def _cache_get(cache: OrderedDict[bytes, tuple[_T, float]], key: bytes) -> _T | None:
+    with _token_cache_lock:
+        cached = cache.get(key)
+        if cached is None:
+            return None
+        if time.time() >= cached[1]:
+            del cache[key]
+            return None
+        cache.move_to_end(key)
+        return cached[0]
+
+
+def _cache_put(
+    cache: OrderedDict[bytes, tuple[_T, float]],
+    key: bytes,
+    value: _T,
+    expires: float,
+    maxsize: int,
+) -> None:
+    with _token_cache_lock:
+        cache[key] = (value, expires)
+        while len(cache) > maxsize:
+            cache.popitem(last=False)
 
 
 class UserGroupCognitoCurrentUser(CognitoCurrentUser):  # type: ignore
@@ -25,16 +76,102 @@ class UserGroupCognitoCurrentUser(CognitoCurrentUser):  # type: ignore
     """
 
     user_info = GroupClaims
+    token_cache_size = 10_000
+    token_cache_ttl = 5.0
+    # Rejected tokens are answered without verification for a short while
+    rejected_token_cache_size = 50_000
+    rejected_token_cache_ttl = 2.0
+
+    def __init__(self, region: str, userPoolId: str, client_id: str):
+        super().__init__(region=region, userPoolId=userPoolId, client_id=client_id)
+        self.client_id = client_id
+        self.issuer = f"https://cognito-idp.{region}.amazonaws.com/{userPoolId}"
+
+    async def __call__(
+        self,
+        http_auth: HTTPAuthorizationCredentials | None = Depends(
+            HTTPBearer(auto_error=False)
+        ),
+    ) -> GroupClaims:
+        if http_auth is None:
+            raise HTTPException(status_code=401, detail=messages.NOT_AUTHENTICATED)
+        key = hashlib.sha256(http_auth.credentials.encode()).digest()
+        cached = _cache_get(_token_cache, key)
+        if cached is not None:
+            return cached
+        rejected = _cache_get(_rejected_token_cache, key)
+        if rejected is not None:
+            # Fresh exception, re-raising the cached one would grow its traceback
+            raise HTTPException(
+                status_code=rejected.status_code, detail=rejected.detail
+            )
+
+        now = time.time()
+        try:
+            user_info = await self.verify(http_auth.credentials)
+        except HTTPException as e:
+            _cache_put(
+                _rejected_token_cache,
+                key,
+                e,
+                now + self.rejected_token_cache_ttl,
+                self.rejected_token_cache_size,
+            )
+            raise
+        expires = now + self.token_cache_ttl
+        if user_info.exp is not None:
+            expires = min(expires, user_info.exp)
+        _cache_put(_token_cache, key, user_info, expires, self.token_cache_size)
+        return user_info
 
-    async def call(
-        self, http_auth: HTTPAuthorizationCredentials
-    ) -> BaseModel | dict[str, Any] | None:
-        user_info = await super().call(http_auth)
-        if "users" not in (getattr(user_info, "cognito_groups") or []):
+    async def _public_key(self, kid: str) -> Any:
+        """Public key by key ID, from the JWKS fetched by fastapi_cloudauth.
+
+        The only access to the library-private key set: fastapi-cloudauth is pinned
+        to 0.4.3 in pyproject.toml, re-check this (and `test_public_key`) on upgrade.
+        """
+        return await self.verifier._jwks.get_publickey(kid)
+
+    async def verify(self, token: str) -> GroupClaims:
+        """Verify the ID token signature and claims in a single decode pass."""
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except JWTError as e:
+            raise HTTPException(
+                status_code=401, detail=messages.NOT_AUTHENTICATED
+            ) from e
+        public_key = await self._public_key(kid) if kid else None
+        if public_key is None:
+            raise HTTPException(status_code=401, detail=messages.NO_PUBLICKEY)
+        try:
+            claims = jwt.decode(
+                token,
+                public_key,
+                algorithms=["RS256"],
+                audience=self.client_id,
+                issuer=self.issuer,
+                options={
+                    "verify_at_hash": False,
+                    "require_exp": True,
+                    "require_iss": True,
+                    "require_aud": True,
+                },
+            )
+        except JWTError as e:
+            raise HTTPException(status_code=401, detail=messages.NOT_VERIFIED) from e
+        if claims.get("token_use", "id") != "id" or claims.get("iat", 0) > time.time():
+            raise HTTPException(status_code=401, detail=messages.NOT_VERIFIED)
+        try:
+            user_info: GroupClaims = GroupClaims.model_validate(claims)
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=401, detail=messages.NOT_VALIDATED_CLAIMS
+            ) from e
+        if "users" not in (user_info.cognito_groups or []):
             raise HTTPException(
                 status_code=403, detail="Not a member of the 'users' group"
             )
-        return user_info  # type: ignore
+        return user_info
 
 
 current_user_dep = UserGroupCognitoCurrentUser(
@@ -63,9 +200,15 @@ class APIKeyDependency:
     def __init__(self, key: str | None):
         """Check API-internal key."""
         self.key = key
+        self._key_bytes = key.encode() if key is not None else None
 
     def __call__(self, x_api_key: str | None = Header(...)) -> str | None:
-        if x_api_key != self.key:
+        if x_api_key is None or self._key_bytes is None:
+            authorized = x_api_key == self.key
+        else:
+            # Constant-time comparison, not to leak the key through response timing
+            authorized = hmac.compare_digest(x_api_key.encode(), self._key_bytes)
+        if not authorized:
             raise HTTPException(status_code=401, detail="unauthorized")
         return x_api_key
 
@@ -73,8 +216,9 @@ class APIKeyDependency:
 workerfacing_api_auth_dep = APIKeyDependency(settings.internal_api_key_secret)
 
 
-async def email_sender_dep() -> notifications.EmailSender:
-    """Get the email sender."""
+@functools.lru_cache(maxsize=1)
+def _build_email_sender() -> notifications.EmailSender:
+    """Email sender shared by all requests, e.g. to keep Mailjet's session alive."""
     service = settings.email_sender_service
     match service:
         case None:
@@ -99,14 +243,64 @@ async def email_sender_dep() -> notifications.EmailSender:
             )
 
 
+async def email_sender_dep(
+    background_tasks: BackgroundTasks,
+) -> notifications.EmailSender:
+    """Get the email sender."""
+    sender = _build_email_sender()
+    if isinstance(sender, notifications.DummyEmailSender):
+        return sender
+    # Mailjet may be throttled and retried for minutes: send after responding
+    return notifications.BackgroundEmailSender(sender, background_tasks)
+
+
+def _make_enqueue_session() -> requests.Session:
+    """Keep-alive session to the worker-facing API, shared by all enqueue calls."""
+    session = requests.Session()
+    session.headers["Content-Type"] = "application/json"
+    if settings.internal_api_key_secret is not None:
+        session.headers["x-api-key"] = settings.internal_api_key_secret
+    # Only retry when the job was certainly not accepted, to avoid enqueueing it twice
+    retries = Retry(
+        total=3,
+        read=0,
+        backoff_factor=0.5,
+        backoff_jitter=0.5,
+        status_forcelist=[429, 503],
+        allowed_methods=["POST"],
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=50, max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+enqueue_session = _make_enqueue_session()
+# Fail fast instead of waiting for timeouts while the worker-facing API is down
+enqueue_breaker = CircuitBreaker(fail_max=5, reset_timeout=30)
+
+
 async def enqueueing_function_dep() -> Callable[[QueueJob], None]:
     def enqueue(queue_item: QueueJob) -> None:
-        resp = requests.post(
-            url=f"{settings.workerfacing_api_url}/_jobs",
-            json=jsonable_encoder(queue_item),
-            headers={"x-api-key": settings.internal_api_key_secret},
-        )
-        if not str(resp.status_code).startswith("2"):
+        data = queue_item.model_dump_json(by_alias=True)
+        if not enqueue_breaker.allow():
+            raise HTTPException(status_code=503, detail="worker API unavailable")
+        failed = True
+        try:
+            resp = enqueue_session.post(
+                url=f"{settings.workerfacing_api_url}/_jobs",
+                data=data,
+                timeout=(3, 30),
+            )
+            failed = resp.status_code >= 500
+        finally:
+            # Whatever the error, so that a half-open probe always gets its outcome
+            if failed:
+                enqueue_breaker.record_failure()
+            else:
+                enqueue_breaker.record_success()
+        if not 200 <= resp.status_code < 300:
             raise HTTPException(
                 status_code=resp.status_code,
                 detail=f"Error while enqueueing job {queue_item.job.meta.job_id}. Traceback: \n{resp.text}.",
@@ -4,7 +4,10 @@ They are turned off in non-development environments,
 as the authentication is handled by the Cognito service.
 """
 
-import boto3
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
@@ -15,9 +18,30 @@ from api.schemas.token import TokenResponse
 from api.schemas.user import User, UserGroups
 from api.settings import cognito_client_id, cognito_secret, cognito_user_pool_id
 
+if TYPE_CHECKING:
+    from mypy_boto3_cognito_idp import CognitoIdentityProviderClient
+
 router = APIRouter()
 
 
+@functools.cache
+def _cognito_client() -> "CognitoIdentityProviderClient":
+    """Client shared by all requests; boto3 clients are thread-safe."""
+    # boto3 is slow to import; these endpoints are only enabled in development
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        "cognito-idp",
+        config=Config(
+            max_pool_connections=50,
+            connect_timeout=5,
+            read_timeout=10,
+            retries={"max_attempts": 3, "mode": "standard"},
+        ),
+    )
+
+
 @router.post(
     "/user",
     status_code=status.HTTP_201_CREATED,
@@ -27,7 +51,7 @@ router = APIRouter()
 def register_user(
     user: OAuth2PasswordRequestForm = Depends(), groups: list[UserGroups] | None = None
 ) -> User:
-    client = boto3.client("cognito-idp")
+    client = _cognito_client()
     try:
         # Perform the signup using the email and password
         response = client.admin_create_user(
@@ -38,22 +62,31 @@ def register_user(
         )
         if not groups:
             groups = [UserGroups.users]
-        for group in groups:
-            client.admin_add_user_to_group(
+        # Once the user exists, the remaining calls are independent round-trips
+        calls: list[Callable[[], Any]] = [
+            functools.partial(
+                client.admin_add_user_to_group,
                 Username=user.username,
                 GroupName=group.value,
                 UserPoolId=cognito_user_pool_id,
             )
-
+            for group in groups
+        ]
         # Reset password to change state
-        client.admin_set_user_password(
-            UserPoolId=cognito_user_pool_id,
-            Username=user.username,
-            Password=user.password,
-            Permanent=True,
+        calls.append(
+            functools.partial(
+                client.admin_set_user_password,
+                UserPoolId=cognito_user_pool_id,
+                Username=user.username,
+                Password=user.password,
+                Permanent=True,
+            )
         )
-        filesystem = get_user_filesystem(response["User"]["Username"])
-        filesystem.init()
+        with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+            for future in [executor.submit(call) for call in calls]:
+                future.result()
+        # Only for a fully registered user; creating it sets up the directories
+        get_user_filesystem(response["User"]["Username"])
     except client.exceptions.ClientError as e:
         if e.response["Error"]["Code"] == "UsernameExistsException":
             raise HTTPException(status_code=409, detail="User already exists")
@@ -75,8 +108,8 @@ def register_user(
     response_model=TokenResponse,
     description="Get a new login token",
 )
-async def get_token(login: OAuth2PasswordRequestForm = Depends()) -> TokenResponse:
-    client = boto3.client("cognito-idp")
+def get_token(login: OAuth2PasswordRequestForm = Depends()) -> TokenResponse:
+    client = _cognito_client()
     try:
         # Perform the login using the email and password
         auth_params = {"USERNAME": login.username, "PASSWORD": login.password}
@@ -115,7 +148,7 @@ async def get_token(login: OAuth2PasswordRequestForm = Depends()) -> TokenRespon
     description="Login to the system (sets a cookie)",
 )
 def get_login(user: OAuth2PasswordRequestForm = Depends()) -> JSONResponse:
-    client = boto3.client("cognito-idp")
+    client = _cognito_client()
     try:
         # Perform the login using the email and password
         auth_params = {"USERNAME": user.username, "PASSWORD": user.password}
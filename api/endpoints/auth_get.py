@@ -1,6 +1,8 @@
 import enum
+import hashlib
+import json
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Response
 
 from api.dependencies import GroupClaims, current_user_dep
 from api.schemas.user import User
@@ -13,19 +15,31 @@ class AccessType(enum.Enum):
     COGNITO = "cognito"
 
 
-@router.get(
-    "/access_info",
-    response_model=dict[AccessType, dict[str, str]],
-    description="Get information about where API users should authenticate",
-)
-def get_access_info() -> dict[AccessType, dict[str, str]]:
-    return {
-        AccessType.COGNITO: {
+_access_info_json = json.dumps(
+    {
+        AccessType.COGNITO.value: {
             "user_pool_id": cognito_user_pool_id,
             "client_id": cognito_client_id,
             "region": cognito_region,
         },
     }
+).encode()
+_access_info_etag = f'"{hashlib.md5(_access_info_json).hexdigest()}"'
+
+
+@router.get(
+    "/access_info",
+    response_model=dict[AccessType, dict[str, str]],
+    description="Get information about where API users should authenticate",
+)
+def get_access_info(if_none_match: str | None = Header(None)) -> Response:
+    # Static configuration: serialized once, revalidated by clients with the ETag
+    headers = {"ETag": _access_info_etag, "Cache-Control": "public, max-age=3600"}
+    if if_none_match == _access_info_etag:
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=_access_info_json, media_type="application/json", headers=headers
+    )
 
 
 @router.get(
@@ -35,5 +49,5 @@ def get_access_info() -> dict[AccessType, dict[str, str]]:
 )
 def describe_current_user(
     current_user: GroupClaims = Depends(current_user_dep),
-) -> dict[str, str | list[str] | None]:
-    return {"email": current_user.email, "groups": current_user.cognito_groups}
+) -> Response:
+    return Response(content=current_user.user_json, media_type="application/json")
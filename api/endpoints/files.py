@@ -1,16 +1,62 @@
-import os
-import re
+import contextlib
+from operator import attrgetter
+from typing import Iterator, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, status
-from fastapi.responses import FileResponse, Response, StreamingResponse
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    status,
+)
+from fastapi.responses import (
+    FileResponse,
+    RedirectResponse,
+    Response,
+    StreamingResponse,
+)
+from pydantic import TypeAdapter
 
 from api import models
 from api.core.filesystem import FileSystem
+from api.core.ttl_cache import TTLCache
 from api.dependencies import filesystem_dep
 from api.schemas import file as file_schemas
 
 router = APIRouter()
 
+# Serializes file listings in one pass with pydantic-core, skipping re-validation
+_file_infos_adapter: TypeAdapter[list[file_schemas.FileInfo]] = TypeAdapter(
+    list[file_schemas.FileInfo]
+)
+
+# Serialized JSON listings by (user root, path, show_dirs, recursive). Kept briefly,
+# since files written through pre-signed URLs or by workers cannot invalidate them.
+_listing_cache: TTLCache[tuple[str, str, bool, bool], bytes] = TTLCache(
+    maxsize=1024, ttl=2.0
+)
+
+
+@contextlib.contextmanager
+def _changes_listings(filesystem: FileSystem) -> Iterator[None]:
+    """Drop the user's cached listings once the change is done (or failed)."""
+    try:
+        yield
+    finally:
+        _listing_cache.remove_if(lambda key: key[0] == filesystem.root_path)
+
+
+def _join(base: str, name: str) -> str:
+    """Storage key of the uploaded file `name` below `base` (always "/"-separated).
+
+    Empty, "." and ".." segments of the client-supplied name are dropped,
+    so the key can neither escape `base` nor become absolute.
+    """
+    parts = [p for p in name.replace("\\", "/").split("/") if p not in ("", ".", "..")]
+    return f"{base.rstrip('/')}/{'/'.join(parts) or 'unnamed'}"
+
 
 @router.get(
     "/files/{file_path:path}/download",
@@ -19,14 +65,39 @@ router = APIRouter()
     description="Download a file",
 )
 def download_file(
-    file_path: str, filesystem: FileSystem = Depends(filesystem_dep)
-) -> FileResponse | StreamingResponse:
+    file_path: str,
+    proxy: bool = False,
+    filesystem: FileSystem = Depends(filesystem_dep),
+) -> FileResponse | RedirectResponse | StreamingResponse:
     try:
+        if not proxy:
+            # Let the client fetch the file from the storage backend directly
+            url = filesystem.download_redirect_url(file_path)
+            if url is not None:
+                return RedirectResponse(
+                    url, status_code=status.HTTP_307_TEMPORARY_REDIRECT
+                )
         return filesystem.download(file_path)
     except FileNotFoundError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
 
 
+@router.head(
+    "/files/{file_path:path}",
+    response_model=None,
+    description="Check that a file exists, without transferring it",
+)
+def head_file(
+    file_path: str, filesystem: FileSystem = Depends(filesystem_dep)
+) -> Response:
+    try:
+        info = filesystem.get_file_info(file_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    headers = {"Content-Length": str(info.size)} if info.size is not None else {}
+    return Response(headers=headers)
+
+
 @router.get(
     "/files/{file_path:path}/url",
     response_model=file_schemas.FileHTTPRequest,
@@ -36,9 +107,7 @@ def get_download_presigned_url(
     file_path: str, request: Request, filesystem: FileSystem = Depends(filesystem_dep)
 ) -> file_schemas.FileHTTPRequest:
     try:
-        return filesystem.download_url(
-            file_path, request, re.escape("/url") + "$", "/download"
-        )
+        return filesystem.download_url(file_path, request, "/url", "/download")
     except FileNotFoundError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
 
@@ -52,13 +121,31 @@ def list_files(
     base_path: str = "",
     show_dirs: bool = True,
     recursive: bool = False,
+    output_format: Literal["json", "ndjson"] = Query("json", alias="format"),
     filesystem: FileSystem = Depends(filesystem_dep),
-) -> list[file_schemas.FileInfo]:
+) -> Response:
     try:
-        return sorted(
-            filesystem.list_directory(base_path, dirs=show_dirs, recursive=recursive),
-            key=lambda x: x.path,
-        )
+        if output_format == "ndjson":
+            # One FileInfo per line, unsorted, sent while the listing is still paged
+            entries = filesystem.list_directory(
+                base_path, dirs=show_dirs, recursive=recursive
+            )
+            return StreamingResponse(
+                (f.model_dump_json().encode() + b"\n" for f in entries),
+                media_type="application/x-ndjson",
+            )
+        key = (filesystem.root_path, base_path, show_dirs, recursive)
+        content = _listing_cache.get(key)
+        if content is None:
+            files = sorted(
+                filesystem.list_directory(
+                    base_path, dirs=show_dirs, recursive=recursive
+                ),
+                key=attrgetter("path"),
+            )
+            content = _file_infos_adapter.dump_json(files)
+            _listing_cache.put(key, content)
+        return Response(content=content, media_type="application/json")
     except NotADirectoryError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
 
@@ -76,9 +163,9 @@ def upload_file(
     filesystem: FileSystem = Depends(filesystem_dep),
 ) -> file_schemas.FileInfo:
     base_path = f"{f_type.value}/" + base_path
-    file_path = os.path.join(base_path, file.filename or "unnamed")
-    filesystem.create_file(file_path, file.file)
-    return filesystem.get_file_info(file_path)
+    file_path = _join(base_path, file.filename or "unnamed")
+    with _changes_listings(filesystem):
+        return filesystem.create_file(file_path, file.file)
 
 
 @router.post(
@@ -94,9 +181,79 @@ def get_upload_presigned_url(
     filesystem: FileSystem = Depends(filesystem_dep),
 ) -> file_schemas.FileHTTPRequest:
     base_path = f"{f_type.value}/" + base_path
-    return filesystem.create_file_url(
-        base_path, request, re.escape("/url") + "$", "/upload"
-    )
+    return filesystem.create_file_url(base_path, request, "/url", "/upload")
+
+
+@router.post(
+    "/files/{f_type}/{file_path:path}/multipart",
+    status_code=status.HTTP_201_CREATED,
+    response_model=file_schemas.MultipartUpload,
+    description="Get pre-signed URLs to upload a large file in parallel parts",
+)
+def create_multipart_upload(
+    f_type: models.UploadFileTypes,
+    file_path: str,
+    parts: int = Query(ge=1, le=10_000),
+    filesystem: FileSystem = Depends(filesystem_dep),
+) -> file_schemas.MultipartUpload:
+    try:
+        return filesystem.create_multipart_upload(f"{f_type.value}/{file_path}", parts)
+    except NotImplementedError:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Multipart uploads are not supported by this storage backend",
+        )
+
+
+@router.post(
+    "/files/{f_type}/{file_path:path}/multipart/complete",
+    status_code=status.HTTP_201_CREATED,
+    response_model=file_schemas.FileInfo,
+    description="Assemble the uploaded parts of a multipart upload into the file",
+)
+def complete_multipart_upload(
+    f_type: models.UploadFileTypes,
+    file_path: str,
+    upload: file_schemas.MultipartUploadComplete,
+    filesystem: FileSystem = Depends(filesystem_dep),
+) -> file_schemas.FileInfo:
+    try:
+        with _changes_listings(filesystem):
+            return filesystem.complete_multipart_upload(
+                f"{f_type.value}/{file_path}", upload.upload_id, upload.parts
+            )
+    except NotImplementedError:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Multipart uploads are not supported by this storage backend",
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post(
+    "/files/{f_type}/{file_path:path}/multipart/abort",
+    status_code=status.HTTP_204_NO_CONTENT,
+    response_model=None,
+    description="Abort a multipart upload and discard its uploaded parts",
+)
+def abort_multipart_upload(
+    f_type: models.UploadFileTypes,
+    file_path: str,
+    upload: file_schemas.MultipartUploadAbort,
+    filesystem: FileSystem = Depends(filesystem_dep),
+) -> None:
+    try:
+        filesystem.abort_multipart_upload(
+            f"{f_type.value}/{file_path}", upload.upload_id
+        )
+    except NotImplementedError:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Multipart uploads are not supported by this storage backend",
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
 @router.post(
@@ -109,7 +266,8 @@ def create_directory(
     base_path: str,
     filesystem: FileSystem = Depends(filesystem_dep),
 ) -> None:
-    return filesystem.create_directory(f"{f_type.value}/{base_path}/")
+    with _changes_listings(filesystem):
+        return filesystem.create_directory(f"{f_type.value}/{base_path}/")
 
 
 @router.put(
@@ -123,7 +281,8 @@ def rename_file(
     filesystem: FileSystem = Depends(filesystem_dep),
 ) -> file_schemas.FileInfo:
     try:
-        filesystem.rename(file_path, file.path)
+        with _changes_listings(filesystem):
+            filesystem.rename(file_path, file.path)
     except FileNotFoundError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
     except IsADirectoryError as e:
@@ -143,4 +302,5 @@ def rename_file(
 def delete_file(
     file_path: str, filesystem: FileSystem = Depends(filesystem_dep)
 ) -> None:
-    filesystem.delete(file_path)
+    with _changes_listings(filesystem):
+        filesystem.delete(file_path)
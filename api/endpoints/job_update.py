@@ -1,11 +1,9 @@
-import datetime
-
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 import api.core.notifications as notifications
 import api.crud.job as job_crud
-from api.database import get_db
+from api.database import engine, get_db
 from api.dependencies import email_sender_dep, workerfacing_api_auth_dep
 from api.models import JobStates
 from api.schemas.job_update import JobUpdate
@@ -23,30 +21,11 @@ def update_job_status(
     db: Session = Depends(get_db),
     email_sender: notifications.EmailSender = Depends(email_sender_dep),
 ) -> JobStates:
-    db_job = job_crud.get_job(db, update.job_id)
+    db_job = job_crud.update_job_status(
+        db, update.job_id, update.status, update.runtime_details
+    )
     if db_job is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
-
-    # Update the status
-    db_job.status = update.status.value
-
-    # Update date_started when job is first pulled/started
-    if update.status == JobStates.pulled and db_job.date_started is None:
-        db_job.date_started = datetime.datetime.now(datetime.timezone.utc)
-
-    # Update date_finished when job reaches a terminal state
-    if (
-        update.status in [JobStates.finished, JobStates.error]
-        and db_job.date_finished is None
-    ):
-        db_job.date_finished = datetime.datetime.now(datetime.timezone.utc)
-
-    if update.runtime_details:
-        db_job.runtime_details = (
-            (db_job.runtime_details or "") + "\n" + update.runtime_details
-        )
-    db.add(db_job)
-    db.commit()
     if (
         update.status.value in [JobStates.finished.value, JobStates.error.value]
         and db_job.user_email
@@ -60,3 +39,13 @@ def update_job_status(
         """.replace("\n", "<br>")
         email_sender.send_email(to=db_job.user_email, subject=subject, body=body)
     return update.status
+
+
+@router.get(
+    "/_db_pool",
+    response_model=dict[str, str],
+    description="Internal endpoint reporting the database connection pool usage",
+)
+def get_db_pool_status() -> dict[str, str]:
+    # Checked out connections and overflow, to make pool exhaustion observable
+    return {"db_pool": engine.pool.status()}
@@ -1,6 +1,16 @@
 from typing import Any, Callable
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Header,
+    HTTPException,
+    Request,
+    Response,
+    status,
+)
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 
 import api.database as database
@@ -11,6 +21,10 @@ from api.settings import application_config
 
 router = APIRouter()
 
+# Validates from the ORM rows and serializes in one pass with pydantic-core,
+# instead of FastAPI's validate, jsonable_encoder and json.dumps passes
+_jobs_adapter: TypeAdapter[list[Job]] = TypeAdapter(list[Job])
+
 
 ApplicationConfig = dict[str, dict[str, dict[str, Any]]]
 
@@ -20,8 +34,16 @@ ApplicationConfig = dict[str, dict[str, dict[str, Any]]]
     response_model=ApplicationConfig,
     description="List all available applications/versions/entrypoints",
 )
-def list_applications() -> ApplicationConfig:
-    return application_config.config
+def list_applications(if_none_match: str | None = Header(None)) -> Response:
+    # Serialized once per config (re)load, revalidated by clients with the ETag
+    content, etag = application_config.config_json
+    if if_none_match == etag:
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+        )
+    return Response(
+        content=content, media_type="application/json", headers={"ETag": etag}
+    )
 
 
 @router.get("/jobs", response_model=list[Job], description="List all jobs")
@@ -29,12 +51,18 @@ def list_jobs(
     request: Request,
     offset: int = 0,
     limit: int = 100,
+    after_id: int | None = None,
     db: Session = Depends(database.get_db),
-) -> list[Job]:
-    return sorted(
-        crud.get_jobs(db, request.state.current_user.username, offset, limit),
-        key=lambda x: x.date_created,
-        reverse=True,
+) -> Response:
+    user_id = request.state.current_user.username
+    if after_id is not None:
+        # Keyset pagination: `offset` is ignored, continue after the last seen job
+        db_jobs = crud.get_jobs_after(db, user_id, after_id, limit)
+    else:
+        db_jobs = crud.get_jobs(db, user_id, offset, limit)
+    jobs = _jobs_adapter.validate_python(db_jobs, from_attributes=True)
+    return Response(
+        content=_jobs_adapter.dump_json(jobs), media_type="application/json"
     )
 
 
@@ -42,8 +70,8 @@ def list_jobs(
 def describe_job(
     request: Request, job_id: int, db: Session = Depends(database.get_db)
 ) -> Job:
-    db_job = crud.get_job(db, job_id)
-    if db_job is None or db_job.user_id != request.state.current_user.username:
+    db_job = crud.get_user_job(db, job_id, request.state.current_user.username)
+    if db_job is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
         )
@@ -61,9 +89,9 @@ def start_job(
     job: JobCreate,
     db: Session = Depends(database.get_db),
     enqueueing_func: Callable[[QueueJob], None] = Depends(enqueueing_function_dep),
-) -> Job:
+) -> Response:
     try:
-        return crud.create_job(
+        db_job = crud.create_job(
             db,
             enqueueing_func,
             job,
@@ -72,6 +100,12 @@ def start_job(
         )
     except FileNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    # Converted once here, FastAPI would otherwise dump and re-validate the model
+    return Response(
+        content=Job.model_validate(db_job, from_attributes=True).model_dump_json(),
+        status_code=status.HTTP_201_CREATED,
+        media_type="application/json",
+    )
 
 
 @router.delete(
@@ -81,11 +115,13 @@ def start_job(
     description="Delete a job",
 )
 def delete_job(
-    request: Request, job_id: int, db: Session = Depends(database.get_db)
+    request: Request,
+    job_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(database.get_db),
 ) -> None:
-    db_job = crud.get_job(db, job_id)
-    if db_job is None or db_job.user_id != request.state.current_user.username:
+    user_id = request.state.current_user.username
+    if not crud.delete_user_job(db, job_id, user_id, background_tasks):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
         )
-    crud.delete_job(db, db_job)
@@ -2,15 +2,33 @@ import dotenv
 
 dotenv.load_dotenv()
 
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from api import dependencies, settings, tags
+from api.core import filesystem
 from api.database import Base, engine
 from api.endpoints import auth, auth_get, files, job_update, jobs
 from api.exceptions import register_exception_handlers
 
-app = FastAPI(openapi_tags=tags.tags_metadata)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    Base.metadata.create_all(bind=engine)
+    # Build the shared clients now rather than on the first requests using them
+    if settings.filesystem == "s3":
+        filesystem._get_s3_client()
+    if settings.auth:
+        auth._cognito_client()
+    dependencies._build_email_sender()
+    yield
+    dependencies.enqueue_session.close()
+
+
+app = FastAPI(openapi_tags=tags.tags_metadata, lifespan=lifespan)
 if settings.frontend_url:
     app.add_middleware(
         CORSMiddleware,
@@ -45,6 +63,7 @@ async def root() -> str:
     return "Welcome to the DECODE OpenCloud User-facing API"
 
 
-@app.on_event("startup")
-def on_startup() -> None:
-    Base.metadata.create_all(bind=engine)
+@app.get("/healthz", include_in_schema=False)
+async def healthz() -> dict[str, str]:
+    # Public liveness only, pool usage is at the internal /_db_pool
+    return {"status": "ok"}
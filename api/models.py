@@ -5,6 +5,7 @@ from sqlalchemy import (
     JSON,
     DateTime,
     Enum,
+    Index,
     Integer,
     String,
     Text,
@@ -66,4 +67,7 @@ class Job(Base):  # type: ignore
 
     __table_args__ = (
         UniqueConstraint("user_id", "job_name", name="_user_job_name_unique"),
+        # Newest-first job listings and their keyset pagination (see crud.job.get_jobs
+        # and get_jobs_after)
+        Index("ix_job_user_id_date_created", "user_id", "date_created", "id"),
     )
@@ -1,7 +1,8 @@
 from enum import Enum
 from typing import Any
 
-from pydantic import BaseModel
+import humanize
+from pydantic import BaseModel, field_serializer
 
 
 class FileBase(BaseModel):
@@ -17,14 +18,6 @@ class FileTypes(Enum):
     directory = "directory"
 
 
-class File(FileBase):
-    type: FileTypes
-    size: str
-
-    class Config:
-        orm_mode = True
-
-
 class FileHTTPRequest(BaseModel):
     method: str
     url: str
@@ -32,7 +25,31 @@ class FileHTTPRequest(BaseModel):
     data: dict[str, Any] = {}
 
 
+class MultipartUpload(BaseModel):
+    upload_id: str
+    parts: list[FileHTTPRequest]  # part number i + 1 is uploaded to parts[i]
+
+
+class CompletedPart(BaseModel):
+    part_number: int
+    etag: str
+
+
+class MultipartUploadComplete(BaseModel):
+    upload_id: str
+    parts: list[CompletedPart]
+
+
+class MultipartUploadAbort(BaseModel):
+    upload_id: str
+
+
 class FileInfo(BaseModel):
     path: str
     type: FileTypes
-    size: str
+    size: int | None = None  # bytes, None for directories
+
+    @field_serializer("size")
+    def serialize_size(self, size: int | None) -> str:
+        # Humanized only when rendering a response, not for every listed entry
+        return humanize.naturalsize(size) if size is not None else ""
@@ -22,9 +22,10 @@ class Application(BaseModel):
 
     @validator("application")
     def application_check(cls: "Application", v: str, values: dict[str, str]) -> str:
-        allowed = list(settings.application_config.config.keys())
-        if v not in allowed:
-            raise ValueError(f"Application must be one of {allowed}, not {v}.")
+        # Dict lookup, the list of names is only built for the error message
+        config = settings.application_config.config
+        if v not in config:
+            raise ValueError(f"Application must be one of {list(config)}, not {v}.")
         return v
 
     @validator("version")
@@ -1,9 +1,10 @@
 import abc
+import hashlib
 import json
 import os
+import time
 from typing import Any, cast
 
-import boto3
 import yaml
 
 
@@ -27,6 +28,17 @@ database_url = os.environ.get("DATABASE_URL", "sqlite:///./sql_app.db")
 if os.environ.get("DATABASE_SECRET"):  # set and not None
     database_secret = _load_possibly_aws_secret("DATABASE_SECRET")
     database_url = database_url.format(database_secret)
+# Connection pool per worker process (ignored for SQLite). Sync endpoints run on
+# AnyIO's threadpool: by default there is a connection for each of its threads,
+# so that no request waits on the pool while holding a thread
+_request_threads = 40  # AnyIO's default
+database_pool_size = int(os.environ.get("DATABASE_POOL_SIZE", "10"))
+database_max_overflow = int(
+    os.environ.get(
+        "DATABASE_MAX_OVERFLOW", str(max(_request_threads - database_pool_size, 0))
+    )
+)
+database_pool_timeout = float(os.environ.get("DATABASE_POOL_TIMEOUT", "10"))
 filesystem = os.environ.get("FILESYSTEM")
 s3_bucket = os.environ.get("S3_BUCKET")
 s3_region = os.environ.get("S3_REGION", "eu-central-1")
@@ -54,19 +66,40 @@ email_sender_address = os.environ.get("EMAIL_SENDER_ADDRESS")
 
 # Config
 class CachedConfig(abc.ABC):
+    # Seconds between modification checks (a HEAD request for S3), the config is read often
+    check_interval = 10.0
+
     def __init__(self, config_path: str):
         """Configuration that is re-read from file when the file is modified."""
         self._config_path = config_path
-        self._config = self._read_config()
+        self._set_config(self._read_config())
         self._cache_date = self._read_last_modified()
+        self._checked_at = time.monotonic()
 
     @property
     def config(self) -> dict[str, Any]:
-        last_modified = self._read_last_modified()
-        if last_modified > self._cache_date:
-            self._config = self._read_config()
-            self._last_modified = self._read_last_modified()
-        return self._config
+        return self._current()[0]
+
+    @property
+    def config_json(self) -> tuple[bytes, str]:
+        """The config serialized to JSON and its ETag, computed once per (re)load."""
+        _, content, etag = self._current()
+        return content, etag
+
+    def _current(self) -> tuple[dict[str, Any], bytes, str]:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            last_modified = self._read_last_modified()
+            if last_modified > self._cache_date:
+                self._set_config(self._read_config())
+                self._cache_date = last_modified
+        return self._state
+
+    def _set_config(self, config: dict[str, Any]) -> None:
+        content = json.dumps(config).encode()
+        # Swapped in as one tuple, so readers never mix a config with another's ETag
+        self._state = (config, content, f'"{hashlib.md5(content).hexdigest()}"')
 
     @abc.abstractmethod
     def _read_config(self) -> dict[str, Any]:
@@ -92,6 +125,8 @@ class LocalConfig(CachedConfig):
 
 class S3Config(CachedConfig):
     def __init__(self, config_path: str, region_name: str):
+        import boto3
+
         self._s3_client = boto3.client(
             "s3",
             region_name=region_name,
@@ -149,6 +149,7 @@ def base_filesystem(
 
 @pytest.fixture
 def user_filesystem(base_filesystem: FileSystem, username: str) -> FileSystem:
+    get_user_filesystem.cache_clear()  # base_filesystem starts from an empty root
     return get_user_filesystem(username)
 
 
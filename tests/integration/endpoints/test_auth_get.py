@@ -0,0 +1,17 @@
+from fastapi.testclient import TestClient
+
+ENDPOINT = "/access_info"
+
+
+def test_get_access_info(client: TestClient) -> None:
+    response = client.get(ENDPOINT)
+    assert response.status_code == 200
+    assert set(response.json()["cognito"]) == {"user_pool_id", "client_id", "region"}
+    assert response.headers["ETag"]
+
+
+def test_get_access_info_not_modified(client: TestClient) -> None:
+    etag = client.get(ENDPOINT).headers["ETag"]
+    response = client.get(ENDPOINT, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
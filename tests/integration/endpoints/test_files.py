@@ -1,12 +1,26 @@
+import json
 import os
+import zipfile
 from io import BytesIO
+from typing import Any, Generator
 
+import pytest
 import requests
 from fastapi.testclient import TestClient
 
+from api.core.filesystem import FileSystem, S3Filesystem
+from api.endpoints import files as files_endpoints
+
 ENDPOINT = "/files"
 
 
+@pytest.fixture(autouse=True)
+def clear_listing_cache() -> Generator[None, Any, None]:
+    files_endpoints._listing_cache.clear()
+    yield
+    files_endpoints._listing_cache.clear()
+
+
 def test_auth_required(client: TestClient, require_auth: None) -> None:
     response = client.get(ENDPOINT)
     assert response.status_code == 401
@@ -42,6 +56,23 @@ def test_get_files_recursive_happy(
     assert {"path": "config/test/", "type": "directory", "size": ""} in response.json()
 
 
+def test_get_files_ndjson(
+    client: TestClient, data_files: dict[str, str], config_files: dict[str, str]
+) -> None:
+    params = {"recursive": True}
+    expected = client.get(f"{ENDPOINT}//", params=params).json()
+    response = client.get(f"{ENDPOINT}//", params={**params, "format": "ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    entries = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(entries, key=lambda e: e["path"]) == expected
+
+
+def test_get_files_ndjson_fail_not_a_directory(client: TestClient) -> None:
+    response = client.get(f"{ENDPOINT}/not_a_dir", params={"format": "ndjson"})
+    assert response.status_code == 404
+
+
 def test_get_files_nodir_happy(client: TestClient, data_files: dict[str, str]) -> None:
     response = client.get(
         f"{ENDPOINT}//", params={"show_dirs": False, "recursive": True}
@@ -71,6 +102,20 @@ def test_get_files_subdir_happy(
     } in response.json()
 
 
+def test_get_files_cached_until_change(
+    client: TestClient, user_filesystem: FileSystem
+) -> None:
+    params = {"recursive": True, "show_dirs": False}
+    assert client.get(f"{ENDPOINT}//", params=params).json() == []
+    # Written behind the API's back: the cached listing is served
+    user_filesystem.create_file("data/other.txt", BytesIO(b"x"))
+    assert client.get(f"{ENDPOINT}//", params=params).json() == []
+    files = {"file": ("new.txt", BytesIO(b"new"), "text/plain")}
+    assert client.post(f"{ENDPOINT}/data//upload", files=files).status_code == 201
+    paths = {f["path"] for f in client.get(f"{ENDPOINT}//", params=params).json()}
+    assert paths == {"data/other.txt", "data/new.txt"}
+
+
 def test_get_files_fail_not_a_directory(client: TestClient) -> None:
     response = client.get(f"{ENDPOINT}/does_not_exist")
     assert response.status_code == 404
@@ -107,6 +152,13 @@ def test_post_files_happy(client: TestClient) -> None:
     } in response.json()
 
 
+def test_post_files_filename_cannot_escape_base_path(client: TestClient) -> None:
+    files = {"file": ("../../x/./y.txt", BytesIO(b"contents"), "text/plain")}
+    response = client.post(f"{ENDPOINT}/data/test/upload", files=files)
+    assert response.status_code == 201
+    assert response.json()["path"] == "data/test/x/y.txt"
+
+
 def test_post_files_fail_not_config_or_data(client: TestClient) -> None:
     files = {
         "file": (
@@ -161,11 +213,85 @@ def test_delete_files_happy(client: TestClient, data_files: dict[str, str]) -> N
 
 def test_download_file_happy(client: TestClient, data_files: dict[str, str]) -> None:
     data_file1_name, data_file1_contents = list(data_files.items())[0]
-    response = client.get(f"{ENDPOINT}/{data_file1_name}/download")
+    response = client.get(
+        f"{ENDPOINT}/{data_file1_name}/download", params={"proxy": True}
+    )
     assert response.status_code == 200
     assert response.content.decode("utf-8") == data_file1_contents
 
 
+def test_download_file_redirect(
+    client: TestClient, user_filesystem: FileSystem, data_files: dict[str, str]
+) -> None:
+    data_file1_name, data_file1_contents = list(data_files.items())[0]
+    response = client.get(
+        f"{ENDPOINT}/{data_file1_name}/download", follow_redirects=False
+    )
+    if isinstance(user_filesystem, S3Filesystem):
+        assert response.status_code == 307
+        assert data_file1_name in response.headers["location"]
+        response = client.get(
+            f"{ENDPOINT}/{data_file1_name}/download", params={"proxy": True}
+        )
+    assert response.status_code == 200
+    assert response.content.decode("utf-8") == data_file1_contents
+
+
+def test_multipart_upload(client: TestClient, user_filesystem: FileSystem) -> None:
+    response = client.post(
+        f"{ENDPOINT}/data/test/large.bin/multipart", params={"parts": 3}
+    )
+    if isinstance(user_filesystem, S3Filesystem):
+        assert response.status_code == 201
+        assert len(response.json()["parts"]) == 3
+    else:
+        assert response.status_code == 501
+
+
+def test_abort_multipart_upload(
+    client: TestClient, user_filesystem: FileSystem
+) -> None:
+    upload_id = "unknown"
+    if isinstance(user_filesystem, S3Filesystem):
+        upload_id = client.post(
+            f"{ENDPOINT}/data/test/large.bin/multipart", params={"parts": 1}
+        ).json()["upload_id"]
+    url = f"{ENDPOINT}/data/test/large.bin/multipart/abort"
+    response = client.post(url, json={"upload_id": upload_id})
+    if isinstance(user_filesystem, S3Filesystem):
+        assert response.status_code == 204
+        # Unknown upload, now that it was aborted
+        response = client.post(url, json={"upload_id": upload_id})
+        assert response.status_code == 400
+    else:
+        assert response.status_code == 501
+
+
+def test_head_file(client: TestClient, data_files: dict[str, str]) -> None:
+    file_name, file_contents = next(iter(data_files.items()))
+    response = client.head(f"{ENDPOINT}/{file_name}")
+    assert response.status_code == 200
+    assert response.headers["content-length"] == str(len(file_contents))
+    assert response.content == b""
+
+
+def test_head_file_not_found(client: TestClient) -> None:
+    response = client.head(f"{ENDPOINT}/data/does_not_exist.txt")
+    assert response.status_code == 404
+
+
+def test_download_directory_happy(
+    client: TestClient, data_files: dict[str, str]
+) -> None:
+    response = client.get(f"{ENDPOINT}/data//download")
+    assert response.status_code == 200
+    with zipfile.ZipFile(BytesIO(response.content)) as zipf:
+        assert {name: zipf.read(name).decode("utf-8") for name in zipf.namelist()} == {
+            os.path.relpath(file_name, "data"): file_contents
+            for file_name, file_contents in data_files.items()
+        }
+
+
 def test_get_url_file_happy(
     env: str, client: TestClient, data_files: dict[str, str]
 ) -> None:
@@ -26,6 +26,17 @@ def test_job_status_update_requires_internal_api_key(
     assert response.status_code == 422
 
 
+def test_job_status_update_wrong_internal_api_key(
+    client: TestClient, internal_api_key_secret: str, jobs: list[Job]
+) -> None:
+    response = client.put(
+        ENDPOINT,
+        json={"job_id": jobs[0].id, "status": "running"},
+        headers={"x-api-key": internal_api_key_secret + "x"},
+    )
+    assert response.status_code == 401
+
+
 def test_job_status_update(
     client: TestClient,
     db_session: Session,
@@ -123,6 +134,35 @@ def test_date_started_not_overwritten(
     assert job.date_started == original_start_date  # Should not change
 
 
+def test_runtime_details_appended(
+    client: TestClient,
+    db_session: Session,
+    internal_api_key_secret: str,
+    jobs: list[Job],
+) -> None:
+    job = jobs[0]
+    for details in ["first", "second"]:
+        response = client.put(
+            ENDPOINT,
+            json={"job_id": job.id, "status": "running", "runtime_details": details},
+            headers={"x-api-key": internal_api_key_secret},
+        )
+        assert response.status_code == 200
+    db_session.refresh(job)
+    assert job.runtime_details == "\nfirst\nsecond"
+
+
+def test_job_status_update_not_found(
+    client: TestClient, internal_api_key_secret: str, jobs: list[Job]
+) -> None:
+    response = client.put(
+        ENDPOINT,
+        json={"job_id": 999999, "status": "running"},
+        headers={"x-api-key": internal_api_key_secret},
+    )
+    assert response.status_code == 404
+
+
 def test_date_finished_set_on_finished_status(
     client: TestClient,
     db_session: Session,
@@ -197,3 +237,14 @@ def test_date_finished_not_overwritten(
 
     db_session.refresh(job)
     assert job.date_finished == original_finish_date  # Should not change
+
+
+def test_db_pool_requires_internal_api_key(client: TestClient) -> None:
+    assert client.get("/_db_pool").status_code == 422
+    assert "db_pool" not in client.get("/healthz").json()
+
+
+def test_db_pool(client: TestClient, internal_api_key_secret: str) -> None:
+    response = client.get("/_db_pool", headers={"x-api-key": internal_api_key_secret})
+    assert response.status_code == 200
+    assert "db_pool" in response.json()
@@ -1,9 +1,13 @@
 import copy
+import datetime
 from typing import Any
 from unittest.mock import MagicMock
 
 import pytest
+import requests
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from api.dependencies import enqueueing_function_dep
@@ -32,6 +36,36 @@ def test_get_jobs(
     enqueuing_func.assert_not_called()
 
 
+def test_get_jobs_after_id(
+    client: TestClient, enqueuing_func: MagicMock, jobs: list[Job]
+) -> None:
+    response = client.get(ENDPOINT, params={"after_id": jobs[1].id})
+    assert response.status_code == 200
+    assert [job["id"] for job in response.json()] == [jobs[0].id]
+    response = client.get(ENDPOINT, params={"after_id": jobs[0].id})
+    assert response.status_code == 200
+    assert response.json() == []
+    enqueuing_func.assert_not_called()
+
+
+def test_get_jobs_after_id_continues_offset_pages(
+    client: TestClient,
+    enqueuing_func: MagicMock,
+    jobs: list[Job],
+    db_session: Session,
+) -> None:
+    # Creation order differs from id order
+    jobs[0].date_created = datetime.datetime(2024, 1, 2)
+    jobs[1].date_created = datetime.datetime(2024, 1, 1)
+    db_session.commit()
+    first_page = client.get(ENDPOINT, params={"limit": 1}).json()
+    assert [job["id"] for job in first_page] == [jobs[0].id]
+    response = client.get(ENDPOINT, params={"after_id": first_page[-1]["id"]})
+    assert [job["id"] for job in response.json()] == [jobs[1].id]
+    response = client.get(ENDPOINT, params={"after_id": jobs[1].id})
+    assert response.json() == []
+
+
 def test_get_job(
     client: TestClient, enqueuing_func: MagicMock, jobs: list[Job]
 ) -> None:
@@ -86,6 +120,7 @@ def test_start_job(
 
 def test_start_job_wrong_files(
     client: TestClient,
+    db_session: Session,
     enqueuing_func: MagicMock,
     data_files: list[tuple[str, str]],
     config_files: list[tuple[str, str]],
@@ -105,6 +140,62 @@ def test_start_job_wrong_files(
     )
     assert response.status_code == 400
     enqueuing_func.assert_not_called()
+    assert db_session.query(Job).filter(Job.job_name == "test_job_push").count() == 0
+
+
+def test_start_job_enqueue_fails(
+    client: TestClient,
+    db_session: Session,
+    enqueuing_func: MagicMock,
+    data_files: list[tuple[str, str]],
+    config_files: list[tuple[str, str]],
+    application: dict[str, str],
+    job_attrs: dict[str, Any],
+) -> None:
+    enqueuing_func.side_effect = HTTPException(status_code=503)
+    response = client.post(
+        ENDPOINT,
+        json={
+            "job_name": "test_job_push",
+            "application": application,
+            "attributes": job_attrs,
+            "hardware": {},
+        },
+    )
+    assert response.status_code == 503
+    assert db_session.query(Job).filter(Job.job_name == "test_job_push").count() == 0
+
+
+@pytest.mark.parametrize(
+    "error, kept",
+    [(requests.ConnectTimeout(), False), (requests.ReadTimeout(), True)],
+)
+def test_start_job_enqueue_outcome_unknown(
+    client: TestClient,
+    db_session: Session,
+    enqueuing_func: MagicMock,
+    data_files: list[tuple[str, str]],
+    config_files: list[tuple[str, str]],
+    application: dict[str, str],
+    job_attrs: dict[str, Any],
+    error: requests.RequestException,
+    kept: bool,
+) -> None:
+    enqueuing_func.side_effect = error
+    with pytest.raises(type(error)):
+        client.post(
+            ENDPOINT,
+            json={
+                "job_name": "test_job_push",
+                "application": application,
+                "attributes": job_attrs,
+                "hardware": {},
+            },
+        )
+    statuses = db_session.scalars(
+        select(Job.status).where(Job.job_name == "test_job_push")
+    ).all()
+    assert statuses == (["error"] if kept else [])
 
 
 def test_start_job_not_unique(
@@ -132,3 +223,12 @@ def test_delete_job(client: TestClient, jobs: list[Job]) -> None:
     assert response.status_code == 204
     response = client.get(f"{ENDPOINT}/{jobs[0].id}")
     assert response.status_code == 404
+
+
+def test_delete_job_wrong_user(
+    client: TestClient, jobs: list[Job], foreign_job: Job
+) -> None:
+    response = client.delete(f"{ENDPOINT}/{foreign_job.id}")
+    assert response.status_code == 404
+    response = client.get(f"{ENDPOINT}/{jobs[0].id}")
+    assert response.status_code == 200
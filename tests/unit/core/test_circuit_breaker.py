@@ -0,0 +1,53 @@
+import pytest
+
+from api.core.circuit_breaker import CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    now = [0.0]
+    monkeypatch.setattr("api.core.circuit_breaker.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_opens_after_consecutive_failures(clock: list[float]) -> None:
+    breaker = CircuitBreaker(fail_max=3, reset_timeout=30)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    breaker.record_success()
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.allow()
+
+
+def test_half_open_probe(clock: list[float]) -> None:
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] = 31
+    assert breaker.allow()
+    # Only a single probe at a time
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+    clock[0] = 62
+    assert breaker.allow()
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.allow()
+
+
+def test_unrecorded_probe_times_out(clock: list[float]) -> None:
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] = 31
+    assert breaker.allow()
+    # The probe's outcome is never recorded
+    clock[0] = 60
+    assert not breaker.allow()
+    clock[0] = 61
+    assert breaker.allow()
+    breaker.record_success()
+    assert not breaker.is_open
@@ -1,15 +1,25 @@
+import asyncio
 import os
 import shutil
+import time
+import zipfile
 from abc import ABC, abstractmethod
 from contextlib import nullcontext
 from io import BytesIO
-from typing import Any, Generator, cast
+from typing import Any, BinaryIO, Generator, cast
 
 import pytest
+from fastapi.responses import StreamingResponse
 from moto import mock_aws
 
-from api.core.filesystem import FileSystem, LocalFilesystem, S3Filesystem
-from api.schemas.file import FileInfo, FileTypes
+from api.core.filesystem import (
+    FileSystem,
+    LocalFilesystem,
+    S3Filesystem,
+    _map_prefetched,
+    _stream_zip,
+)
+from api.schemas.file import CompletedPart, FileInfo, FileTypes
 from tests.conftest import S3TestingBucket
 
 
@@ -33,6 +43,47 @@ def data_file1_contents() -> str:
     return "data file1 contents"
 
 
+def test_map_prefetched_discards_unconsumed_results_on_close() -> None:
+    produced: list[int] = []
+    discarded: list[int] = []
+
+    def produce(x: int) -> int:
+        produced.append(x)
+        return x
+
+    results = _map_prefetched(produce, range(10), window=4, discard=discarded.append)
+    assert next(results) == 0
+    results.close()
+    time.sleep(0.2)  # calls in flight complete (and are discarded) in the workers
+    # Calls not yet started are cancelled, the others' results are discarded
+    assert set(produced) <= {0, 1, 2, 3}
+    assert sorted(discarded) == sorted(set(produced) - {0})
+
+
+def test_stream_zip_closes_sources_on_close() -> None:
+    sources = [BytesIO(b"x" * (2 << 20)) for _ in range(3)]
+    members = (
+        (zipfile.ZipInfo(f"f{i}"), cast(BinaryIO, src)) for i, src in enumerate(sources)
+    )
+    archive = _stream_zip(members)
+    next(archive)
+    archive.close()
+    assert sources[0].closed
+    assert members.gi_frame is None  # member generator closed as well
+
+
+def _zip_entry(filesystem: FileSystem, path: str, arcname: str) -> zipfile.ZipInfo:
+    """Entry `arcname` of the zipped download of the directory `path`."""
+    response = filesystem.download(path)
+    assert isinstance(response, StreamingResponse)
+
+    async def read_body() -> bytes:
+        return b"".join([cast(bytes, c) async for c in response.body_iterator])
+
+    with zipfile.ZipFile(BytesIO(asyncio.run(read_body()))) as zipf:
+        return zipf.getinfo(arcname)
+
+
 class _TestFilesystem(ABC):
     @abstractmethod
     @pytest.fixture(scope="class")
@@ -64,6 +115,41 @@ class _TestFilesystem(ABC):
         with pytest.raises(NotADirectoryError):
             filesystem.list_directory(data_file1_name)
 
+    @pytest.mark.parametrize(
+        "path,normalized",
+        [
+            ("data//test/./x.txt", "data/test/x.txt"),
+            ("/data/test//", "data/test/"),
+            ("./", "/"),
+            ("", ""),
+        ],
+    )
+    def test_full_path_normalized(
+        self, filesystem: FileSystem, path: str, normalized: str
+    ) -> None:
+        assert filesystem.full_path(path) == filesystem.full_path(normalized)
+
+    def test_probe_invalidated_after_mutation(
+        self,
+        filesystem: FileSystem,
+        monkeypatch: pytest.MonkeyPatch,
+        data_file1_name: str,
+        data_file1: None,
+        data_file2_name: str,
+    ) -> None:
+        rename_file = filesystem._rename_file
+
+        def rename_with_concurrent_lookup(path: str, new_path: str) -> None:
+            # As if another request looked the target up while the rename is running
+            assert filesystem._probe(data_file2_name) == "missing"
+            rename_file(path, new_path)
+
+        monkeypatch.setattr(filesystem, "_rename_file", rename_with_concurrent_lookup)
+        assert filesystem._probe(data_file1_name) == "file"
+        filesystem.rename(data_file1_name, data_file2_name)
+        assert filesystem._probe(data_file1_name) == "missing"
+        assert filesystem._probe(data_file2_name) == "file"
+
     def test_rename_nonexistent_raises(
         self,
         filesystem: FileSystem,
@@ -115,16 +201,36 @@ class _TestFilesystem(ABC):
     ) -> None:
         files = list(filesystem.list_directory("data/", recursive=True))
         assert len(files) == 2
-        assert FileInfo(path="data/test/", type=FileTypes.directory, size="") in files
+        assert FileInfo(path="data/test/", type=FileTypes.directory) in files
         assert (
             FileInfo(
                 path=data_file1_name,
                 type=FileTypes.file,
-                size="{} Bytes".format(len(data_file1_contents)),
+                size=len(data_file1_contents),
             )
             in files
         )
 
+    def test_list_directory_recursive_nested(
+        self, filesystem: FileSystem, data_file1_contents: str
+    ) -> None:
+        for name in ["data/a/b/c.txt", "data/a/d.txt", "data/e.txt"]:
+            filesystem.create_file(name, BytesIO(data_file1_contents.encode("utf-8")))
+        files = list(filesystem.list_directory("data/", recursive=True))
+        assert sorted(f.path for f in files) == [
+            "data/a/",
+            "data/a/b/",
+            "data/a/b/c.txt",
+            "data/a/d.txt",
+            "data/e.txt",
+        ]
+        files = list(filesystem.list_directory("data/", dirs=False, recursive=True))
+        assert sorted(f.path for f in files) == [
+            "data/a/b/c.txt",
+            "data/a/d.txt",
+            "data/e.txt",
+        ]
+
     def test_list_directory_subdir(
         self,
         filesystem: FileSystem,
@@ -137,7 +243,7 @@ class _TestFilesystem(ABC):
         assert files[0] == FileInfo(
             path=data_file1_name,
             type=FileTypes.file,
-            size="{} Bytes".format(len(data_file1_contents)),
+            size=len(data_file1_contents),
         )
 
     def test_get_file_info(
@@ -151,21 +257,26 @@ class _TestFilesystem(ABC):
         assert info == FileInfo(
             path=data_file1_name,
             type=FileTypes.file,
-            size="{} Bytes".format(len(data_file1_contents)),
+            size=len(data_file1_contents),
         )
 
+    def test_get_file_info_not_found(self, filesystem: FileSystem) -> None:
+        with pytest.raises(FileNotFoundError):
+            filesystem.get_file_info("data/does_not_exist.txt")
+
     def test_create_file(
         self, filesystem: FileSystem, data_file1_name: str, data_file1_contents: str
     ) -> None:
-        filesystem.create_file(
+        info = filesystem.create_file(
             data_file1_name, BytesIO(bytes(data_file1_contents, "utf-8"))
         )
         assert filesystem.exists(data_file1_name)
-        assert filesystem.get_file_info(data_file1_name) == FileInfo(
+        assert info == FileInfo(
             path=data_file1_name,
             type=FileTypes.file,
-            size="{} Bytes".format(len(data_file1_contents)),
+            size=len(data_file1_contents),
         )
+        assert filesystem.get_file_info(data_file1_name) == info
 
     def test_rename(
         self,
@@ -180,7 +291,7 @@ class _TestFilesystem(ABC):
         assert filesystem.get_file_info(data_file2_name) == FileInfo(
             path=data_file2_name,
             type=FileTypes.file,
-            size="{} Bytes".format(len(data_file1_contents)),
+            size=len(data_file1_contents),
         )
         assert not filesystem.exists(data_file1_name)
 
@@ -194,6 +305,11 @@ class _TestFilesystem(ABC):
     ) -> None:
         assert filesystem.exists("data/")
 
+    def test_exists_true_for_directory_without_slash(
+        self, filesystem: FileSystem, data_file1: None
+    ) -> None:
+        assert filesystem.exists("data/test")
+
     def test_exists_false_for_nonexistent_object(
         self, filesystem: FileSystem, data_file1_name: str
     ) -> None:
@@ -220,6 +336,25 @@ class _TestFilesystem(ABC):
     def test_isdir_root(self, filesystem: FileSystem) -> None:
         assert filesystem.isdir("/")
 
+    def test_probe(
+        self, filesystem: FileSystem, data_file1_name: str, data_file1: None
+    ) -> None:
+        assert filesystem._probe("/") == "dir"
+        assert filesystem._probe("data/test/") == "dir"
+        assert filesystem._probe(data_file1_name) == "file"
+        assert filesystem._probe("data/missing.txt") == "missing"
+
+    def test_probe_invalidated_by_mutations(
+        self, filesystem: FileSystem, data_file1_name: str, data_file1_contents: str
+    ) -> None:
+        assert filesystem._probe(data_file1_name) == "missing"
+        filesystem.create_file(
+            data_file1_name, BytesIO(bytes(data_file1_contents, "utf-8"))
+        )
+        assert filesystem._probe(data_file1_name) == "file"
+        filesystem.delete(data_file1_name)
+        assert filesystem._probe(data_file1_name) == "missing"
+
     def test_delete_file(
         self, filesystem: FileSystem, data_file1_name: str, data_file1: None
     ) -> None:
@@ -233,6 +368,17 @@ class _TestFilesystem(ABC):
         assert not filesystem.exists("data/test/")
         assert not filesystem.exists(data_file1_name)
 
+    def test_delete_many(
+        self, filesystem: FileSystem, data_file1_name: str, data_file1: None
+    ) -> None:
+        for name in ["data/a/x.txt", "data/a/y/z.txt", "data/b.txt", "data/c.txt"]:
+            filesystem.create_file(name, BytesIO(b"x"))
+        filesystem.delete_many(["data/a/", "data/b.txt", "data/missing/"])
+        assert not filesystem.exists("data/a/")
+        assert not filesystem.exists("data/b.txt")
+        assert filesystem.exists("data/c.txt")
+        assert filesystem.exists(data_file1_name)
+
 
 class TestLocalFilesystem(_TestFilesystem):
     @pytest.fixture(scope="class")
@@ -253,6 +399,17 @@ class TestLocalFilesystem(_TestFilesystem):
         with open(data_file1_name, "w") as f:
             f.write(data_file1_contents)
 
+    def test_download_directory_keeps_metadata(
+        self, filesystem: FileSystem, data_file1_name: str, data_file1: None
+    ) -> None:
+        full_path = filesystem.full_path(data_file1_name)
+        mtime = time.mktime((2020, 1, 2, 3, 4, 6, 0, 0, -1))
+        os.utime(full_path, (mtime, mtime))
+        os.chmod(full_path, 0o640)
+        zinfo = _zip_entry(filesystem, "data/test/", "data_file1.txt")
+        assert zinfo.date_time == (2020, 1, 2, 3, 4, 6)
+        assert zinfo.external_attr >> 16 & 0o777 == 0o640
+
 
 class TestS3Filesystem(_TestFilesystem):
     @pytest.fixture(
@@ -287,3 +444,84 @@ class TestS3Filesystem(_TestFilesystem):
             Key=data_file1_name,
             Body=BytesIO(data_file1_contents.encode("utf-8")),
         )
+
+    def test_download_directory_keeps_mtime(
+        self, filesystem: FileSystem, data_file1_name: str, data_file1: None
+    ) -> None:
+        filesystem = cast(S3Filesystem, filesystem)
+        last_modified = filesystem.s3_client.head_object(
+            Bucket=filesystem.bucket, Key=filesystem.full_path(data_file1_name)
+        )["LastModified"]
+        zinfo = _zip_entry(filesystem, "data/test/", "data_file1.txt")
+        expected = last_modified.astimezone().timetuple()[:6]
+        # Zip timestamps have a 2 s resolution
+        assert zinfo.date_time == (*expected[:5], expected[5] // 2 * 2)
+
+    def test_download_redirect_url(
+        self, filesystem: FileSystem, data_file1_name: str, data_file1: None
+    ) -> None:
+        url = filesystem.download_redirect_url(data_file1_name)
+        assert url is not None and data_file1_name in url
+        assert filesystem.download_redirect_url("data/test/") is None
+        with pytest.raises(FileNotFoundError):
+            filesystem.download_redirect_url("data/missing.txt")
+
+    def test_multipart_upload(
+        self, filesystem: FileSystem, data_file1_name: str, data_file1_contents: str
+    ) -> None:
+        filesystem = cast(S3Filesystem, filesystem)
+        upload = filesystem.create_multipart_upload(data_file1_name, parts=2)
+        assert len(upload.parts) == 2
+        assert all(upload.upload_id in part.url for part in upload.parts)
+        etag = filesystem.s3_client.upload_part(
+            Bucket=filesystem.bucket,
+            Key=filesystem.full_path(data_file1_name),
+            UploadId=upload.upload_id,
+            PartNumber=1,
+            Body=data_file1_contents.encode("utf-8"),
+        )["ETag"]
+        with pytest.raises(ValueError):
+            filesystem.complete_multipart_upload(
+                data_file1_name,
+                upload.upload_id,
+                [CompletedPart(part_number=1, etag='"wrong"')],
+            )
+        info = filesystem.complete_multipart_upload(
+            data_file1_name, upload.upload_id, [CompletedPart(part_number=1, etag=etag)]
+        )
+        assert info == FileInfo(
+            path=data_file1_name, type=FileTypes.file, size=len(data_file1_contents)
+        )
+
+    def test_abort_multipart_upload(
+        self, filesystem: FileSystem, data_file1_name: str
+    ) -> None:
+        filesystem = cast(S3Filesystem, filesystem)
+        upload = filesystem.create_multipart_upload(data_file1_name, parts=1)
+        filesystem.abort_multipart_upload(data_file1_name, upload.upload_id)
+        uploads = filesystem.s3_client.list_multipart_uploads(Bucket=filesystem.bucket)
+        assert "Uploads" not in uploads
+        with pytest.raises(ValueError):
+            filesystem.abort_multipart_upload(data_file1_name, upload.upload_id)
+
+    def test_multipart_storage_errors_not_request_errors(
+        self,
+        filesystem: FileSystem,
+        data_file1_name: str,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        filesystem = cast(S3Filesystem, filesystem)
+        upload = filesystem.create_multipart_upload(data_file1_name, parts=1)
+        monkeypatch.setattr(filesystem, "bucket", "no-such-bucket")
+        with pytest.raises(filesystem.s3_client.exceptions.ClientError) as e:
+            filesystem.abort_multipart_upload(data_file1_name, upload.upload_id)
+        assert not isinstance(e.value, ValueError)
+
+    def test_delete_directory_batched(
+        self, filesystem: FileSystem, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(filesystem, "DELETE_BATCH_SIZE", 2)
+        for i in range(5):
+            filesystem.create_file(f"data/batch/{i}.txt", BytesIO(b"x"))
+        filesystem.delete("data/batch/")
+        assert not filesystem.exists("data/batch/")
@@ -0,0 +1,58 @@
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import HTTPException
+
+from api.core import notifications
+
+
+def _response(status_code: int, headers: dict[str, str] | None = None) -> MagicMock:
+    response = MagicMock(status_code=status_code, text="")
+    response.headers = headers or {}
+    return response
+
+
+@pytest.fixture
+def sleeps(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    sleeps: list[float] = []
+    monkeypatch.setattr("api.core.notifications.time.sleep", sleeps.append)
+    return sleeps
+
+
+def _sender(*responses: Any) -> notifications.MailjetEmailSender:
+    sender = notifications.MailjetEmailSender("key", "secret", "from@example.com")
+    sender.mailjet = MagicMock()
+    sender.mailjet.send.create.side_effect = list(responses)
+    return sender
+
+
+def test_mailjet_honors_retry_after(sleeps: list[float]) -> None:
+    sender = _sender(_response(429, {"Retry-After": "7"}), _response(200))
+    sender.send_email("to@example.com", "subject", "body")
+    assert sleeps == [7.0]
+
+
+def test_mailjet_retries_server_errors_with_capped_backoff(
+    sleeps: list[float],
+) -> None:
+    sender = _sender(*[_response(503)] * 3, _response(200))
+    sender.send_email("to@example.com", "subject", "body")
+    assert len(sleeps) == 3
+    assert all(0 <= s <= sender.backoff_cap for s in sleeps)
+
+
+def test_mailjet_gives_up_after_max_retries(sleeps: list[float]) -> None:
+    sender = _sender(
+        *[_response(429)] * (notifications.MailjetEmailSender.max_retries + 1)
+    )
+    with pytest.raises(HTTPException):
+        sender.send_email("to@example.com", "subject", "body")
+    assert len(sleeps) == sender.max_retries
+
+
+def test_mailjet_does_not_retry_client_errors(sleeps: list[float]) -> None:
+    sender = _sender(_response(400))
+    with pytest.raises(HTTPException):
+        sender.send_email("to@example.com", "subject", "body")
+    assert sleeps == []
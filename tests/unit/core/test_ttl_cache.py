@@ -0,0 +1,48 @@
+import pytest
+
+from api.core.ttl_cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    now = [0.0]
+    monkeypatch.setattr("api.core.ttl_cache.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_entries_expire(clock: list[float]) -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl=2)
+    cache.put("a", 1)
+    clock[0] = 1
+    assert cache.get("a") == 1
+    clock[0] = 2
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_expired_entries_evicted_on_put(clock: list[float]) -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    clock[0] = 3
+    cache.put("c", 3)
+    assert len(cache) == 1
+
+
+def test_bounded(clock: list[float]) -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=2)
+    for i, key in enumerate("abc"):
+        cache.put(key, i)
+    assert len(cache) == 2
+    assert cache.get("a") is None
+    assert cache.get("c") == 2
+
+
+def test_remove_if() -> None:
+    cache: TTLCache[tuple[str, int], int] = TTLCache(maxsize=10, ttl=1.0)
+    for key in [("a", 1), ("a", 2), ("b", 1)]:
+        cache.put(key, key[1])
+    cache.remove_if(lambda key: key[0] == "a")
+    assert cache.get(("a", 1)) is None
+    assert cache.get(("a", 2)) is None
+    assert cache.get(("b", 1)) == 1
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import time
+from typing import Any, Generator
+from unittest.mock import AsyncMock
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from fastapi_cloudauth.cognito import JWKS  # type: ignore
+from jose import jwk, jwt  # type: ignore
+
+from api import dependencies
+from api.dependencies import GroupClaims, current_user_dep
+
+KID = "test-key"
+
+
+@pytest.fixture(scope="module")
+def private_key() -> rsa.RSAPrivateKey:
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture(autouse=True)
+def signing_key(
+    private_key: rsa.RSAPrivateKey, monkeypatch: pytest.MonkeyPatch
+) -> Generator[None, Any, None]:
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    keys = {KID: jwk.construct(public_pem, algorithm="RS256")}
+    monkeypatch.setattr(current_user_dep.verifier, "_jwks", JWKS(fixed_keys=keys))
+    dependencies._token_cache.clear()
+    dependencies._rejected_token_cache.clear()
+    yield
+    dependencies._token_cache.clear()
+    dependencies._rejected_token_cache.clear()
+
+
+def _token(private_key: rsa.RSAPrivateKey, **overrides: Any) -> str:
+    claims = {
+        "cognito:username": "user",
+        "email": "user@example.com",
+        "cognito:groups": ["users"],
+        "aud": current_user_dep.client_id,
+        "iss": current_user_dep.issuer,
+        "token_use": "id",
+        "iat": int(time.time()),
+        "exp": int(time.time()) + 3600,
+        **overrides,
+    }
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    return str(jwt.encode(claims, private_pem, algorithm="RS256", headers={"kid": KID}))
+
+
+def _authenticate(token: str) -> GroupClaims:
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    return asyncio.run(current_user_dep(credentials))
+
+
+def test_public_key() -> None:
+    # Fails if fastapi_cloudauth stops exposing its key set as `verifier._jwks`
+    assert isinstance(vars(current_user_dep.verifier).get("_jwks"), JWKS)
+    assert asyncio.run(current_user_dep._public_key(KID)) is not None
+    assert asyncio.run(current_user_dep._public_key("other-key")) is None
+
+
+def test_current_user_verified_once_per_token(
+    private_key: rsa.RSAPrivateKey, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    verify = AsyncMock(wraps=current_user_dep.verify)
+    monkeypatch.setattr(current_user_dep, "verify", verify)
+    token = _token(private_key)
+    assert _authenticate(token).username == "user"
+    assert _authenticate(token).username == "user"
+    assert verify.await_count == 1
+
+
+def test_current_user_json(private_key: rsa.RSAPrivateKey) -> None:
+    token = _token(private_key)
+    user = _authenticate(token)
+    assert json.loads(user.user_json) == {
+        "email": "user@example.com",
+        "groups": ["users"],
+    }
+    assert _authenticate(token).user_json is user.user_json
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {"exp": int(time.time()) - 1},
+        {"aud": "other-client"},
+        {"iss": "https://example.com"},
+        {"token_use": "access"},
+    ],
+)
+def test_current_user_invalid_token(
+    private_key: rsa.RSAPrivateKey, overrides: dict[str, Any]
+) -> None:
+    with pytest.raises(HTTPException) as e:
+        _authenticate(_token(private_key, **overrides))
+    assert e.value.status_code == 401
+
+
+def test_current_user_rejection_cached(
+    private_key: rsa.RSAPrivateKey, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    verify = AsyncMock(wraps=current_user_dep.verify)
+    monkeypatch.setattr(current_user_dep, "verify", verify)
+    token = _token(private_key, aud="other-client")
+    for _ in range(2):
+        with pytest.raises(HTTPException) as e:
+            _authenticate(token)
+        assert e.value.status_code == 401
+    assert verify.await_count == 1
+
+
+def test_current_user_not_in_users_group(private_key: rsa.RSAPrivateKey) -> None:
+    with pytest.raises(HTTPException) as e:
+        _authenticate(_token(private_key, **{"cognito:groups": ["admin"]}))
+    assert e.value.status_code == 403
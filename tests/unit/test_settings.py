@@ -0,0 +1,56 @@
+import json
+import os
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+from api.settings import LocalConfig
+
+
+@pytest.fixture
+def config_file(tmp_path: Path) -> Path:
+    path = tmp_path / "application_config.yaml"
+    path.write_text("app:\n  version: 1\n")
+    return path
+
+
+def _modify(config_file: Path, contents: str) -> None:
+    mtime = os.path.getmtime(config_file)
+    config_file.write_text(contents)
+    os.utime(config_file, (mtime + 1, mtime + 1))
+
+
+def test_local_config_reloaded_once_after_modification(
+    config_file: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    config = LocalConfig(str(config_file))
+    monkeypatch.setattr(config, "check_interval", 0)
+    _modify(config_file, "app:\n  version: 2\n")
+    assert config.config == {"app": {"version": 2}}
+
+    read_config = Mock()
+    monkeypatch.setattr(config, "_read_config", read_config)
+    assert config.config == {"app": {"version": 2}}
+    read_config.assert_not_called()
+
+
+def test_local_config_not_checked_within_interval(config_file: Path) -> None:
+    config = LocalConfig(str(config_file))
+    _modify(config_file, "app:\n  version: 2\n")
+    assert config.config == {"app": {"version": 1}}
+
+
+def test_local_config_json_follows_reload(
+    config_file: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    config = LocalConfig(str(config_file))
+    monkeypatch.setattr(config, "check_interval", 0)
+    content, etag = config.config_json
+    assert json.loads(content) == {"app": {"version": 1}}
+    assert config.config_json == (content, etag)
+
+    _modify(config_file, "app:\n  version: 2\n")
+    new_content, new_etag = config.config_json
+    assert json.loads(new_content) == {"app": {"version": 2}}
+    assert new_etag != etag